@@ -0,0 +1,208 @@
+import os
+
+import pandas as pd
+
+
+ARROW_TYPES = {'string': 'string', 'int64': 'int64', 'float64': 'float64'}
+
+
+def connector_kwargs(connection_string: str | None) -> dict | None:
+    """
+    Translates the DSN-less ODBC connection string in Snowflake_Connection_String into
+    snowflake.connector.connect() arguments, so both drivers share one setting.
+    Returns None for DSN based strings, which only pyodbc can resolve.
+    """
+    if not connection_string:
+        return None
+
+    parts = dict(part.split('=', 1) for part in connection_string.split(';') if '=' in part)
+    parts = {key.strip().lower(): value.strip().strip('{}') for key, value in parts.items()}
+
+    if 'server' not in parts:
+        return None
+
+    kwargs = {'account': parts['server'].split('.snowflakecomputing.com')[0],
+              'user': parts.get('uid'),
+              'password': parts.get('pwd')}
+    kwargs.update({key: parts[key] for key in ('authenticator', 'database', 'schema', 'warehouse', 'role') if key in parts})
+
+    return {key: value for key, value in kwargs.items() if value is not None}
+
+
+class Source:
+    """
+    Runs extract queries and returns pandas DataFrames with the requested dtypes.
+    Sources are context managers that own their connection.
+    """
+
+    def read(self, sql: str, params: list | None = None, dtype: dict | str | None = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def read_chunks(self, sql: str, params: list | None = None, dtype: dict | str | None = None,
+                    chunksize: int = 500_000):
+        """
+        Yields the query result as a series of DataFrames, for consumers that must not hold it all at once.
+        """
+        yield self.read(sql, params, dtype)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class OdbcSource(Source):
+    """
+    pyodbc fallback. Rows are built as Python objects and converted by pandas.
+    """
+
+    def __init__(self, connection_string: str | None = None):
+        import pyodbc as odbc
+
+        self.con = odbc.connect(connection_string or os.environ.get('Snowflake_Connection_String'))
+
+    def read(self, sql: str, params: list | None = None, dtype: dict | str | None = None) -> pd.DataFrame:
+        return pd.read_sql_query(sql=sql, con=self.con, params=params or None, dtype=dtype)
+
+    def read_chunks(self, sql: str, params: list | None = None, dtype: dict | str | None = None,
+                    chunksize: int = 500_000):
+        yield from pd.read_sql_query(sql=sql, con=self.con, params=params or None, dtype=dtype, chunksize=chunksize)
+
+    def close(self) -> None:
+        self.con.close()
+
+
+class ArrowSource(Source):
+    """
+    Base class for sources that deliver results as Arrow record batches. The dtype map is
+    applied in Arrow and columns are handed to pandas without per-row Python objects, with
+    strings kept Arrow backed. Concatenating and casting the batches still copies each column.
+    Subclasses implement fetch_arrow_batches().
+    """
+
+    def fetch_arrow_batches(self, sql: str, params: list | None = None):
+        """
+        Yields pyarrow.Table or pyarrow.RecordBatch objects for the query result.
+        """
+        raise NotImplementedError
+
+    def read(self, sql: str, params: list | None = None, dtype: dict | str | None = None) -> pd.DataFrame:
+        import pyarrow as pa
+
+        batches = [pa.Table.from_batches([batch]) if isinstance(batch, pa.RecordBatch) else batch
+                   for batch in self.fetch_arrow_batches(sql, params)]
+        batches = [batch for batch in batches if batch.num_columns]
+
+        if not batches:
+            columns = list(dtype) if isinstance(dtype, dict) else []
+            return pd.DataFrame({col: pd.Series(dtype=dtype[col]) for col in columns})
+
+        return to_pandas(pa.concat_tables(batches), dtype)
+
+    def read_chunks(self, sql: str, params: list | None = None, dtype: dict | str | None = None,
+                    chunksize: int = 500_000):
+        """
+        Yields one DataFrame per Arrow batch; chunksize is decided by the server.
+        """
+        import pyarrow as pa
+
+        for batch in self.fetch_arrow_batches(sql, params):
+            table = pa.Table.from_batches([batch]) if isinstance(batch, pa.RecordBatch) else batch
+            if table.num_columns:
+                yield to_pandas(table, dtype)
+
+
+def to_pandas(table, dtype: dict | str | None) -> pd.DataFrame:
+    """
+    Casts an Arrow table to the dtype map and converts it with Arrow backed strings.
+    Like pd.read_sql_query, raises ValueError for int64 columns that hold nulls instead of
+    returning them as float64.
+    """
+    import pyarrow as pa
+
+    targets = {name: dtype if isinstance(dtype, str) else (dtype or {}).get(name) for name in table.column_names}
+    nulls = [name for name, target in targets.items() if target == 'int64' and table.column(name).null_count]
+    if nulls:
+        raise ValueError(f'Cannot convert column(s) with nulls to int64: {", ".join(nulls)}')
+
+    table = table.cast(arrow_schema(table.schema, dtype))
+
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype('pyarrow')}.get,
+                           split_blocks=True,
+                           self_destruct=True)
+
+
+def arrow_schema(schema, dtype: dict | str | None):
+    """
+    Applies a pandas dtype map ('string', 'int64', 'float64') to an Arrow schema.
+    A single dtype string applies to every column, as in pd.read_sql_query.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for schema_field in schema:
+        target = dtype if isinstance(dtype, str) else (dtype or {}).get(schema_field.name)
+        arrow_type = pa.type_for_alias(ARROW_TYPES[target]) if target else schema_field.type
+        fields.append(pa.field(schema_field.name, arrow_type))
+
+    return pa.schema(fields)
+
+
+class SnowflakeArrowSource(ArrowSource):
+    """
+    Fetches result batches in Arrow format through snowflake-connector-python.
+    """
+
+    def __init__(self, connection_string: str | None = None):
+        import snowflake.connector
+
+        kwargs = connector_kwargs(connection_string or os.environ.get('Snowflake_Connection_String'))
+        if kwargs is None:
+            raise ValueError('Snowflake_Connection_String must be a DSN-less ODBC string to use the Arrow extract.')
+
+        snowflake.connector.paramstyle = 'qmark'
+        self.con = snowflake.connector.connect(**kwargs)
+
+    def fetch_arrow_batches(self, sql: str, params: list | None = None):
+        import pyarrow as pa
+
+        cursor = self.con.cursor()
+        try:
+            cursor.execute(sql, params or None)
+            empty = True
+            for batch in cursor.fetch_arrow_batches():
+                empty = False
+                yield batch
+            if empty:
+                # No batches are returned for an empty result; keep the column names for the dtype map.
+                yield pa.table({column.name: pa.array([], pa.string()) for column in cursor.description})
+        finally:
+            cursor.close()
+
+    def close(self) -> None:
+        self.con.close()
+
+
+def open_source(driver: str | None = None) -> Source:
+    """
+    Opens an extract source.
+        :param driver: 'arrow', 'odbc' or 'auto' (Arrow when snowflake-connector-python and
+                       a DSN-less connection string are available, otherwise pyodbc).
+                       Defaults to the Snowflake_Extract_Driver environment variable, then 'auto'.
+        :return: Source
+    """
+    driver = driver or os.environ.get('Snowflake_Extract_Driver', 'auto')
+
+    if driver == 'odbc':
+        return OdbcSource()
+    if driver == 'arrow':
+        return SnowflakeArrowSource()
+
+    try:
+        return SnowflakeArrowSource()
+    except (ImportError, ValueError):
+        return OdbcSource()
@@ -0,0 +1,224 @@
+import json
+from functools import cache
+from inspect import signature
+
+import numpy as np
+import pandas as pd
+
+import stored_procedures
+from rules import RULES
+from utils import format_df
+
+
+# Bit i of a row's issue bitset is set when FUSED_RULES[i] flags the row.
+# Positions follow registry order, so stored bitsets carry their own bit -> issue_code mapping.
+FUSED_RULES = [rule for rule in RULES if rule.scope == 'row']
+
+# bitset_frame() attrs key, and Parquet schema metadata key, of the bit -> issue_code mapping.
+BITS_KEY = 'issue_bits'
+
+GTIN_PATTERN = r'^\d{8}$|^\d{12}$|^\d{13}$|^\d{14}$'
+
+
+def mask(series) -> np.ndarray:
+    """
+    Converts a (possibly nullable) boolean Series to a numpy bool array.
+    NA counts as False, the same way a pandas boolean filter drops it.
+    """
+    if isinstance(series, pd.Series):
+        return series.fillna(False).to_numpy(dtype=bool)
+
+    return np.asarray(series, dtype=bool)
+
+
+def issue_args(rule) -> dict:
+    """
+    Returns issue_category, issue_code and error_message for a rule, taken from the
+    stored_procedures function defaults and the rule's registry kwargs.
+    """
+    params = signature(getattr(stored_procedures, rule.function)).parameters
+    args = {name: param.default for name, param in params.items() if param.default is not param.empty}
+    args.update(rule.kwargs)
+
+    return {key: args[key] for key in ('issue_category', 'issue_code', 'error_message')}
+
+
+def issue_bits(df: pd.DataFrame, rules: list | None = None) -> np.ndarray:
+    """
+    Evaluates every row-local rule in a single pass over the column arrays.
+    Shared sub-expressions are computed once and no filtered copies are made.
+        :param df: Target DataFrame contain SKU/UOM data for evaluation.
+        :param rules: Subset of FUSED_RULES to evaluate. Defaults to all of them.
+        :return: np.ndarray[uint32] with one issue bitset per row of df.
+    """
+    rules = FUSED_RULES if rules is None else rules
+    names = {rule.name for rule in rules}
+    bits = np.zeros(len(df), dtype=np.uint32)
+
+    if df.empty or not names:
+        return bits
+
+    def blank_or_zero(series) -> np.ndarray:
+        return mask(series.isna() | (series == 0))
+
+    # Sub-expressions shared between rules are evaluated at most once.
+    @cache
+    def is_alt():
+        return df['base_uom'] != df['alt_uom']
+
+    @cache
+    def alt_only():
+        return mask(is_alt())
+
+    @cache
+    def alt_with_qty():
+        return alt_only() & mask(df['conversion_numerator'] > 1)
+
+    @cache
+    def is_one_to_one():
+        return df['conversion_numerator'] == df['conversion_denominator']
+
+    @cache
+    def packaged():
+        return mask(df['alt_uom'] != 'PAL') & mask(~(is_alt() & is_one_to_one()))
+
+    for bit, rule in enumerate(FUSED_RULES):
+        if rule.name not in names:
+            continue
+
+        if rule.name == 'package_dimensions':
+            length, width, height = df['length'], df['width'], df['height']
+            flagged = alt_with_qty() & (mask((length == 1) & (width == 1) & (height == 1))
+                                      | mask(length.isna() | width.isna() | height.isna())
+                                      | mask((length == 0) | (width == 0) | (height == 0)))
+        elif rule.name in ('blank_numerator', 'blank_denominator'):
+            flagged = blank_or_zero(df[rule.kwargs['column_label']])
+        elif rule.name == 'is_alt_uom_volume_zero':
+            flagged = alt_with_qty() & blank_or_zero(df['volume'])
+        elif rule.name == 'is_alt_uom_weight_zero':
+            flagged = alt_with_qty() & blank_or_zero(df['gross_weight'])
+        elif rule.name == 'redundant_conversion':
+            flagged = alt_only() & mask(is_one_to_one()) & mask(df['conversion_numerator'] > 1)
+        elif rule.name == 'invalid_gtin':
+            upc = df['upc']
+            flagged = mask(upc.notna()) & mask(~upc.str.match(GTIN_PATTERN)) & packaged()
+        elif rule.name == 'upc_required':
+            flagged = mask(df['upc'].isna()) & packaged()
+        else:
+            raise ValueError(f'No fused predicate for rule {rule.name}')
+
+        bits[flagged] |= np.uint32(1 << bit)
+
+    return bits
+
+
+def expand_bits(df: pd.DataFrame, bits: np.ndarray, rules: list | None = None) -> list:
+    """
+    Expands a bitset back to formatted issue rows, one DataFrame per rule.
+        :param df: DataFrame the bitset was computed from.
+        :param bits: Output of issue_bits().
+        :param rules: Rules to expand. Defaults to FUSED_RULES.
+        :return: list of pd.DataFrame | material_number | alt_uom | date_discovered | date_resolved | issue_category | error_message |
+    """
+    rules = FUSED_RULES if rules is None else rules
+    response_array = []
+
+    for bit, rule in enumerate(FUSED_RULES):
+        if rule not in rules:
+            continue
+
+        rows = np.flatnonzero(bits & np.uint32(1 << bit))
+        if rows.size == 0:
+            continue
+
+        flagged_df = df.iloc[rows]
+        if rule.name == 'package_dimensions':
+            flagged_df = flagged_df.drop_duplicates()  # package_dimensions de-duplicates whole rows
+
+        response_array.append(format_df(flagged_df[['material_number', 'alt_uom']].copy(), **issue_args(rule)))
+
+    return response_array
+
+
+def run_fused(df: pd.DataFrame, rules: list | None = None) -> list:
+    """
+    Fused equivalent of running each row-local rule function on df.
+    """
+    return expand_bits(df, issue_bits(df, rules), rules)
+
+
+def bitset_frame(df: pd.DataFrame, bits: np.ndarray) -> pd.DataFrame:
+    """
+    Compact result format for storing a run: one row per flagged SKU/UOM with its issue bitset.
+    attrs['issue_bits'] lists the issue_code of every bit, so the frame can be read after RULES changes.
+    """
+    flagged = bits != 0
+
+    bits_df = pd.DataFrame({'material_number': df['material_number'].to_numpy()[flagged],
+                            'alt_uom': df['alt_uom'].to_numpy()[flagged],
+                            'issue_bits': bits[flagged]})
+
+    bits_df = (bits_df
+               .groupby(['material_number', 'alt_uom'], as_index=False, dropna=False)['issue_bits']
+               .agg(np.bitwise_or.reduce))
+    bits_df.attrs[BITS_KEY] = [rule.issue_code for rule in FUSED_RULES]
+
+    return bits_df
+
+
+def write_bitsets(bits_df: pd.DataFrame, path: str) -> None:
+    """
+    Writes a bitset_frame() to Parquet with its bit -> issue_code mapping in the schema metadata.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(bits_df, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), BITS_KEY.encode(): json.dumps(bits_df.attrs[BITS_KEY]).encode()}
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def read_bitsets(path: str) -> pd.DataFrame:
+    """
+    Reads a write_bitsets() file back with its bit -> issue_code mapping in attrs.
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    metadata = table.schema.metadata or {}
+    if BITS_KEY.encode() not in metadata:
+        raise ValueError(f'{path} has no {BITS_KEY} mapping; it was not written by write_bitsets()')
+
+    bits_df = table.to_pandas()
+    bits_df.attrs[BITS_KEY] = json.loads(metadata[BITS_KEY.encode()])
+
+    return bits_df
+
+
+def diff_bitsets(previous: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compares two bitset_frame() outputs. Both must carry the same bit -> issue_code mapping.
+        :return: pd.DataFrame | material_number | alt_uom | issue_code | change | where change is 'new' or 'resolved'
+    """
+    issue_codes = previous.attrs.get(BITS_KEY)
+    if issue_codes is None or current.attrs.get(BITS_KEY) is None:
+        raise ValueError(f'Bitset frames need their {BITS_KEY} mapping in attrs, as bitset_frame() sets it')
+    if list(issue_codes) != list(current.attrs[BITS_KEY]):
+        raise ValueError('Bitset frames use different bit -> issue_code mappings; re-run one with the other\'s rules')
+
+    merged = previous.merge(current, on=['material_number', 'alt_uom'], how='outer', suffixes=('_previous', '_current'))
+    old = merged['issue_bits_previous'].fillna(0).astype(np.uint32).to_numpy()
+    new = merged['issue_bits_current'].fillna(0).astype(np.uint32).to_numpy()
+
+    df_list = []
+    for bit, issue_code in enumerate(issue_codes):
+        flag = np.uint32(1 << bit)
+        for change, rows in (('new', (new & flag) & ~(old & flag)), ('resolved', (old & flag) & ~(new & flag))):
+            changed = merged.loc[rows != 0, ['material_number', 'alt_uom']]
+            if not changed.empty:
+                df_list.append(changed.assign(issue_code=issue_code, change=change))
+
+    if not df_list:
+        return pd.DataFrame(columns=['material_number', 'alt_uom', 'issue_code', 'change'])
+
+    return pd.concat(df_list, ignore_index=True)
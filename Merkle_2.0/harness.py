@@ -0,0 +1,424 @@
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+import reference_procedures
+from exempt_pcat import exempt_pcat
+from queries import material_dtypes
+from rules import RULES
+from spill import bucket_duplicates
+
+
+ISSUE_KEY = ['material_number', 'alt_uom', 'issue_category', 'issue_code', 'error_message']
+
+UPC_COLUMNS = ['material_number', 'alt_uom', 'upc']
+
+# Alternate units and the numerators they are usually built with.
+LADDER = {'PK': [2, 4, 6], 'BX': [6, 10, 12], 'CS': [12, 24, 48], 'PAL': [480, 960, 1440]}
+
+CATEGORIES = ['Lighting', 'Faucets', 'Filters/HVAC', exempt_pcat[0], None]
+
+VALID_UPCS = ['012345678905', '10012345678902', '20012345678909', '30012345678906', '12345670']
+
+INVALID_UPCS = ['abc', '1234567', '0', '123456789012345']
+
+# material_data columns as named in the SAP tables the rule predicates are written against.
+SAP_COLUMNS = {'material_number': ('mara', 'matnr'),
+               'base_uom': ('mara', 'meins'),
+               'alt_uom': ('marm', 'meinh'),
+               'conversion_numerator': ('marm', 'umrez'),
+               'conversion_denominator': ('marm', 'umren'),
+               'upc': ('marm', 'ean11'),
+               'length': ('marm', 'laeng'),
+               'width': ('marm', 'breit'),
+               'height': ('marm', 'hoehe'),
+               'volume': ('marm', 'volum'),
+               'gross_weight': ('marm', 'brgew')}
+
+
+def mean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    MEAN stand-in built from material_data. MEAN is keyed on material and unit, so neither is ever blank.
+    """
+    return df[UPC_COLUMNS].dropna(subset=['material_number', 'alt_uom'])
+
+
+def duplicate_upc_rows(mean_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    What the duplicate_upc query returns for a MEAN stand-in: one 'material - unit' row per use of a repeated UPC.
+    """
+    df = mean_df[mean_df['upc'].notna()]
+    df = df[df.groupby('upc')['upc'].transform('size') > 1].sort_values('upc', kind='stable')
+
+    return pd.DataFrame({'error_message': df['material_number'].astype(object) + ' - ' + df['alt_uom'].astype(object),
+                         'upc': df['upc'].to_numpy()}).astype('string')
+
+
+def reference(df: pd.DataFrame, rules: list, mean_df: pd.DataFrame | None = None) -> list:
+    """
+    The oracle: every rule's frozen reference_procedures function run on the whole frame.
+        :param df: material_data DataFrame.
+        :param rules: Rules to evaluate.
+        :param mean_df: MEAN stand-in (material_number, alt_uom, upc) for unique_upc(). Defaults to mean_frame(df).
+        :return: list of issue DataFrames.
+    """
+    mean_df = mean_frame(df) if mean_df is None else mean_df
+    response_array = []
+
+    for rule in rules:
+        function = partial(getattr(reference_procedures, rule.function), **rule.kwargs)
+        if rule.function == 'unique_upc':
+            response_array.append(function(df, duplicate_upc_df=duplicate_upc_rows(mean_df)))
+        else:
+            response_array.append(function(df))
+
+    return response_array
+
+
+def live(df: pd.DataFrame, rules: list, mean_df: pd.DataFrame | None = None,
+         duplicate_upc_df: pd.DataFrame | None = None) -> list:
+    """
+    Every rule's current stored_procedures function, as rule runs call it. unique_upc() is handed
+    its duplicates instead of querying Snowflake.
+        :param duplicate_upc_df: Duplicates for unique_upc(). Defaults to spill.bucket_duplicates() on mean_df.
+    """
+    response_array = []
+
+    for rule in rules:
+        if rule.function == 'unique_upc':
+            if duplicate_upc_df is None:
+                duplicate_upc_df = bucket_duplicates(mean_frame(df) if mean_df is None else mean_df)
+            response_array.append(rule.run(df, duplicate_upc_df=duplicate_upc_df))
+        else:
+            response_array.append(rule.run(df))
+
+    return response_array
+
+
+def fused_engine(df: pd.DataFrame, rules: list, mean_df: pd.DataFrame | None = None) -> list:
+    from fused import run_fused
+
+    return run_fused(df, rules)
+
+
+def arrow_engine(df: pd.DataFrame, rules: list, mean_df: pd.DataFrame | None = None) -> list:
+    """
+    The rules on Arrow backed strings, as returned by the Arrow extract driver.
+    """
+    strings = [col for col in df.columns if df[col].dtype == 'string']
+    df = df.astype({col: pd.StringDtype('pyarrow') for col in strings})
+
+    return live(df, rules, mean_df)
+
+
+def sharded_engine(df: pd.DataFrame, rules: list, mean_df: pd.DataFrame | None = None, shards: int = 8) -> list:
+    """
+    The rules on hash shards of materials, as --watch micro-batches and --materials runs see them.
+    MEAN stays whole, since duplicate UPCs are found across the catalog.
+    """
+    duplicate_upc_df = bucket_duplicates(mean_frame(df) if mean_df is None else mean_df)
+    shard = pd.util.hash_pandas_object(df['material_number'], index=False).to_numpy() % shards
+    response_array = []
+
+    for i in range(shards):
+        response_array.extend(live(df[shard == i], rules, duplicate_upc_df=duplicate_upc_df))
+
+    return response_array
+
+
+def pushdown_rows(df: pd.DataFrame, predicate: str) -> np.ndarray:
+    """
+    Positions of the rows a rule's SQL predicate keeps, evaluated by SQLite on mara/marm
+    tables built from the frame, so the predicate text is the one sent to Snowflake.
+    """
+    con = sqlite3.connect(':memory:')
+
+    try:
+        for table in ('mara', 'marm'):
+            columns = {sap: col for col, (name, sap) in SAP_COLUMNS.items() if name == table}
+            table_df = df[list(columns.values())].set_axis(list(columns), axis=1)
+            # Strings go in as str/None. Numbers keep their dtype so they get numeric affinity, NaN binds as NULL.
+            table_df = table_df.astype({col: object for col in table_df.columns if table_df[col].dtype == 'string'})
+            table_df = table_df.mask(table_df.isna(), None).assign(row_id=np.arange(len(df)))
+            table_df.to_sql(table, con, index=False)
+
+        rows = con.execute(f'SELECT mara.row_id FROM mara JOIN marm ON mara.row_id = marm.row_id '
+                           f'WHERE {predicate} ORDER BY mara.row_id').fetchall()
+    finally:
+        con.close()
+
+    return np.array([row[0] for row in rows], dtype=np.int64)
+
+
+def pushdown_engine(df: pd.DataFrame, rules: list, mean_df: pd.DataFrame | None = None) -> list:
+    """
+    The rules on only the rows each rule's where predicate selects, as in a single rule run.
+    Its time includes loading SQLite, so the speedup only bounds what Snowflake pushdown saves.
+    """
+    return [live(df.iloc[pushdown_rows(df, rule.where)], [rule], mean_df)[0] for rule in rules]
+
+
+def spill_engine(df: pd.DataFrame, rules: list, mean_df: pd.DataFrame | None = None,
+                 memory_budget: str = '16KB') -> list:
+    """
+    unique_upc() on spill.duplicate_upcs() with a budget small enough to force spilling.
+    """
+    import tempfile
+
+    from spill import duplicate_upcs
+
+    mean_df = mean_frame(df) if mean_df is None else mean_df
+    chunks = (mean_df.iloc[start:start + 500] for start in range(0, len(mean_df), 500))
+
+    with tempfile.TemporaryDirectory() as directory:
+        duplicate_upc_df = duplicate_upcs(chunks, memory_budget, directory, fanout=8)
+
+    return live(df, rules, duplicate_upc_df=duplicate_upc_df)
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """
+    An engine checked against the reference.
+        :param name: Name used on the command line and in results.
+        :param function: Callable(df, rules, mean_df) returning a list of issue DataFrames.
+        :param scopes: Rule scopes the engine evaluates. Other rules are left out of its comparison.
+        :param pushdown: Only rules with a where predicate.
+    """
+    name: str
+    function: object
+    scopes: tuple = ('row', 'material', 'catalog')
+    pushdown: bool = False
+
+    def rules(self, rules: list) -> list:
+        return [rule for rule in rules if rule.scope in self.scopes and (rule.where or not self.pushdown)]
+
+
+CANDIDATES = [
+    Candidate(name='fused', function=fused_engine, scopes=('row',)),
+    Candidate(name='arrow', function=arrow_engine),
+    Candidate(name='sharded', function=sharded_engine),
+    Candidate(name='pushdown', function=pushdown_engine, pushdown=True),
+    Candidate(name='spill', function=spill_engine, scopes=('catalog',)),
+]
+
+
+def material_frame(materials: int = 500, seed: int = 0, null_rate: float = 0.0, one_to_one: float = 0.1,
+                   pallet_only: float = 0.1, upc_pool: int | None = None, duplicate_rows: float = 0.02) -> pd.DataFrame:
+    """
+    Random material_data with plausible UOM ladders and a dose of every kind of bad data.
+        :param materials: Number of materials.
+        :param seed: Random seed.
+        :param null_rate: Share of values blanked in every nullable column.
+        :param one_to_one: Share of alternate units with numerator equal to denominator.
+        :param pallet_only: Share of materials whose ladder is only the base unit and PAL.
+        :param upc_pool: Draw UPCs from this many values, so they repeat across materials. None keeps them mostly unique.
+        :param duplicate_rows: Share of rows repeated with the same material_number and alt_uom.
+        :return: pd.DataFrame with material_dtypes.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for material in rng.choice(10 ** 8, materials, replace=False):
+        if rng.random() < pallet_only:
+            alt_uoms = ['PAL']
+        else:
+            alt_uoms = [uom for uom in LADDER if rng.random() < 0.5]
+
+        base_uom = 'EA' if rng.random() < 0.9 else 'CS'
+        category = CATEGORIES[rng.integers(len(CATEGORIES))]
+        each = rng.choice([0.5, 1.0, 2.0, 30.0])
+        rows.append((material, category, base_uom, base_uom, 1, 1, each))
+
+        for alt_uom in alt_uoms:
+            numerator = int(rng.choice(LADDER[alt_uom] + [0, 1]))
+            denominator = numerator if numerator and rng.random() < one_to_one else int(rng.choice([1, 1, 1, 0, 2]))
+            rows.append((material, category, base_uom, alt_uom, numerator, denominator, each * max(numerator, 1)))
+
+    df = pd.DataFrame(rows, columns=['material_number', 'product_category', 'base_uom', 'alt_uom', 'conversion_numerator',
+                                     'conversion_denominator', 'gross_weight'])
+    n = len(df)
+    size = np.cbrt(df['gross_weight'].to_numpy()) * 4
+
+    def noisy(values: np.ndarray) -> np.ndarray:
+        # Mostly consistent with the numerator, with zeros, dummy 1s and outliers mixed in.
+        return np.select([rng.random(n) < 0.05, rng.random(n) < 0.05, rng.random(n) < 0.05],
+                         [0.0, 1.0, values * rng.choice([0.1, 10.0], n)], values)
+
+    length, width, height = (noisy(size * rng.uniform(0.8, 1.2, n)) for _ in range(3))
+
+    if upc_pool:
+        pool = (VALID_UPCS + INVALID_UPCS + [f'{i:012d}' for i in range(upc_pool)])[:upc_pool]
+        upc = rng.choice(pool, n)
+    else:
+        upc = np.char.zfill(rng.choice(10 ** 11, n, replace=False).astype(str), 12)
+        upc = np.where(rng.random(n) < 0.05, rng.choice(VALID_UPCS + INVALID_UPCS, n), upc)
+    upc = np.where(rng.random(n) < 0.1, None, upc)
+
+    df = df.assign(material_number=df['material_number'].astype(str),
+                   upc=upc,
+                   length=length,
+                   width=width,
+                   height=height,
+                   volume=noisy(length * width * height),
+                   gross_weight=noisy(df['gross_weight'].to_numpy()))
+
+    repeats = df[rng.random(n) < duplicate_rows]
+    df = pd.concat([df, repeats], ignore_index=True)
+
+    if null_rate:
+        for col in ['product_category', 'base_uom', 'alt_uom', 'upc', 'length', 'width', 'height', 'volume',
+                    'gross_weight']:
+            df[col] = df[col].mask(rng.random(len(df)) < null_rate)
+
+    # Rows arrive in the extract's ORDER BY, which larger_alt_volume() relies on.
+    df = df.sort_values(['material_number', 'conversion_numerator'], kind='stable', ignore_index=True)
+
+    return df[list(material_dtypes)].astype(material_dtypes)
+
+
+SCENARIOS = {
+    'random': {},
+    'nulls': {'null_rate': 0.3},
+    'one_to_one': {'one_to_one': 1.0},
+    'pallet_only': {'pallet_only': 1.0},
+    'duplicate_upcs': {'upc_pool': 9},
+    'shared_upcs': {'upc_pool': 200},
+    'duplicate_alt_uoms': {'duplicate_rows': 0.3},
+}
+
+
+def scenario_frames(materials: int = 500, seeds: list | range = range(1), scenarios: list | None = None):
+    """
+    Yields (scenario, seed, material_data) for every scenario and seed.
+    """
+    for name in scenarios or SCENARIOS:
+        for seed in seeds:
+            yield name, seed, material_frame(materials, seed, **SCENARIOS[name])
+
+
+def issue_set(response_array: list) -> set:
+    """
+    Issues as a set of ISSUE_KEY tuples. Row order, repeated rows and date_discovered are ignored.
+    """
+    response_array = [df for df in response_array if df is not None and not df.empty]
+    if not response_array:
+        return set()
+
+    df = pd.concat(response_array)[ISSUE_KEY].astype(object)
+
+    return set(df.where(df.notna(), None).astype(str).itertuples(index=False, name=None))
+
+
+def best_time(function, repeat: int) -> tuple:
+    """
+    Runs function repeat times and returns (result of the last run, fastest run in seconds).
+    """
+    best = np.inf
+
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+
+    return result, best
+
+
+def compare(df: pd.DataFrame, candidates: list | None = None, rules: list | None = None, repeat: int = 1) -> pd.DataFrame:
+    """
+    Runs every candidate and the reference on the rules the candidate covers and checks the issues are set-equal.
+        :param df: material_data DataFrame.
+        :param candidates: Candidates to check. Defaults to CANDIDATES.
+        :param rules: Rules to compare on. Defaults to RULES.
+        :param repeat: Timed runs per engine. The fastest counts.
+        :return: pd.DataFrame | engine | rules | equal | missing | extra | reference_seconds | candidate_seconds | speedup |
+    """
+    candidates = CANDIDATES if candidates is None else candidates
+    rules = RULES if rules is None else rules
+    results = []
+
+    for candidate in candidates:
+        candidate_rules = candidate.rules(rules)
+        if not candidate_rules:
+            continue
+
+        expected, reference_seconds = best_time(lambda: reference(df, candidate_rules), repeat)
+        actual, candidate_seconds = best_time(lambda: candidate.function(df, candidate_rules), repeat)
+        expected, actual = issue_set(expected), issue_set(actual)
+
+        results.append({'engine': candidate.name,
+                        'rules': len(candidate_rules),
+                        'equal': expected == actual,
+                        'missing': len(expected - actual),
+                        'extra': len(actual - expected),
+                        'reference_seconds': reference_seconds,
+                        'candidate_seconds': candidate_seconds,
+                        'speedup': reference_seconds / candidate_seconds if candidate_seconds else np.nan})
+
+    return pd.DataFrame(results, columns=['engine', 'rules', 'equal', 'missing', 'extra', 'reference_seconds',
+                                          'candidate_seconds', 'speedup'])
+
+
+def run_harness(materials: int = 500, seeds: list | range = range(1), scenarios: list | None = None,
+                candidates: list | None = None, repeat: int = 1) -> pd.DataFrame:
+    """
+    compare() on every scenario frame.
+        :return: compare() results with scenario, seed and issue row count columns in front.
+    """
+    results = []
+
+    for name, seed, df in scenario_frames(materials, seeds, scenarios):
+        result = compare(df, candidates, repeat=repeat)
+        result.insert(0, 'scenario', name)
+        result.insert(1, 'seed', seed)
+        result.insert(2, 'row_count', len(df))
+        results.append(result)
+
+    return pd.concat(results, ignore_index=True)
+
+
+def split_arg(value: str | None) -> list | None:
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+
+def main(argv: list | None = None):
+    parser = argparse.ArgumentParser(description='Check candidate engines against the frozen reference procedures '
+                                                 'on randomized and adversarial material_data and time them.')
+    parser.add_argument('--materials', type=int, default=500, help='Materials per generated frame.')
+    parser.add_argument('--seeds', type=int, default=3, help='Frames generated per scenario.')
+    parser.add_argument('--scenarios', help=f'Comma separated scenarios. Default: {",".join(SCENARIOS)}.')
+    parser.add_argument('--engines', help=f'Comma separated engines. Default: {",".join(c.name for c in CANDIDATES)}.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per engine. The fastest counts.')
+    parser.add_argument('--output', default='harness_results.csv',
+                        help='CSV the results are appended to, to follow speedups from run to run.')
+    args = parser.parse_args(argv)
+
+    engines = split_arg(args.engines)
+    candidates = [c for c in CANDIDATES if not engines or c.name in engines]
+    scenarios = split_arg(args.scenarios)
+    unknown = set(engines or []) - {c.name for c in CANDIDATES} | set(scenarios or []) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'Unknown engine(s) or scenario(s): {", ".join(sorted(unknown))}')
+
+    results = run_harness(args.materials, range(args.seeds), scenarios, candidates, args.repeat)
+    results.insert(0, 'run_at', datetime.now().isoformat(timespec='seconds'))
+    results.to_csv(args.output, mode='a', header=not os.path.exists(args.output), index=False)
+
+    summary = results.groupby('engine', sort=False).agg(equal=('equal', 'all'),
+                                                       mismatched_frames=('equal', lambda equal: int((~equal).sum())),
+                                                       speedup=('speedup', 'median'))
+    print(summary.to_string())
+
+    if not summary['equal'].all():
+        raise SystemExit('Candidate engine output differs from the reference')
+
+
+if __name__ == '__main__':
+    main()
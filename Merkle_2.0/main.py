@@ -1,51 +1,357 @@
+import argparse
 import os
+import re
 
-import pandas as pd
-import pyodbc as odbc
-
-from queries import material_data
-from stored_procedures import *
-
-def main():
-    with odbc.connect(os.environ.get('Snowflake_Connection_String')) as con:
-        material_df = pd.read_sql_query(sql=material_data, con=con, dtype={'material_number': 'string',
-                                                                           'product_category': 'string',
-                                                                           'base_uom': 'string',
-                                                                           'alt_uom': 'string',
-                                                                           'conversion_numerator': 'int64',
-                                                                           'conversion_denominator': 'int64',
-                                                                           'upc': 'string',
-                                                                           'length': 'float64',
-                                                                           'width': 'float64',
-                                                                           'height': 'float64',
-                                                                           'volume': 'float64',
-                                                                           'gross_weight': 'float64'})
-
-    response_array: list = []
-
-    response_array.append(package_dimensions(material_df))
-    response_array.append(is_blank_or_zero(material_df, 'conversion_numerator', 'BLANK_NUM', 'Numerator cannot be blank or zero.'))
-    response_array.append(is_blank_or_zero(material_df, 'conversion_denominator', 'BLANK_DENOM', 'Denominator cannot be blank or zero.'))
-    response_array.append(is_alt_uom_volume_zero(material_df))
-    response_array.append(smaller_alt_volume(material_df))
-    response_array.append(larger_alt_volume(material_df))
-    response_array.append(is_alt_uom_weight_zero(material_df))
-    response_array.append(missing_alternate_uom(material_df))
-    response_array.append(invalid_numerator(material_df))
-    response_array.append(duplicate_alt_uoms(material_df))
-    response_array.append(alt_uom_mod(material_df))
-    response_array.append(inv_conv_by_upc(material_df))
-    response_array.append(redundant_conversion(material_df))
-    response_array.append(pallet_case_fault_tolerance(material_df))
-    response_array.append(smaller_gross_weight_failure(material_df))
-    response_array.append(larger_gross_weight_failure(material_df))
-    response_array.append(invalid_gtin(material_df))
-    response_array.append(upc_required(material_df))
-    response_array.append(package_dimensions(material_df))
-    response_array.append(unique_upc(material_df))
-
-    error_df = pd.concat(response_array)
-    error_df.to_csv('error_output.csv', index=False)
+from queries import material_dtypes, material_query, material_sample
+from rules import required_columns, row_filter, select_rules
+
+
+def split_arg(value: str | None) -> list | None:
+    """
+    Splits a comma separated command line value into a list of stripped values.
+    """
+    if not value:
+        return None
+
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def material_filter(value: str | list | None) -> tuple:
+    """
+    Builds the SQL predicate and parameters for the --materials argument.
+    Accepts a comma separated list (100,200), a numeric range (100-200),
+    a path to a file containing one material number per line or a list of material numbers.
+    Only digits on both sides of a hyphen make a range; any other value is a material number.
+        :param value: Raw --materials argument or list of material numbers.
+        :return: (SQL predicate or None, list of query parameters)
+    """
+    if not value:
+        return None, []
+
+    if isinstance(value, list):
+        materials = [material.lstrip('0') for material in value]
+    elif os.path.isfile(value):
+        with open(value) as file:
+            materials = [line.strip().lstrip('0') for line in file if line.strip()]
+    elif match := re.fullmatch(r'\s*(\d+)\s*-\s*(\d+)\s*', value):
+        start, end = int(match.group(1)), int(match.group(2))
+        if start > end:
+            raise ValueError(f'Material range {value} ends before it starts')
+        return 'TRY_TO_NUMBER(LTRIM(mara.matnr, 0)) BETWEEN ? AND ?', [start, end]
+    else:
+        materials = [material.lstrip('0') for material in split_arg(value) or []]
+
+    if not materials:
+        raise ValueError(f'No material numbers in {value}')
+
+    placeholders = ', '.join('?' for _ in materials)
+
+    return f'LTRIM(mara.matnr, 0) IN ({placeholders})', materials
+
+
+def parse_args(argv: list | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Validate SAP material master data and write the issues found.')
+    parser.add_argument('--rules', help='Comma separated rule names or issue codes, e.g. INVALID_UPC,NO_UPC.')
+    parser.add_argument('--category', help='Comma separated issue categories, e.g. SUPPLY_CHAIN.')
+    parser.add_argument('--materials', help='Material list (100,200), range (100-200) or file with one material per line.')
+    parser.add_argument('--output', default='error_output.csv',
+                        help='Issue file. Format follows the suffix: .csv[.gz|.bz2|.xz], .parquet or .arrow.')
+    parser.add_argument('--table', help='Write issues to this Snowflake table instead of a file.')
+    parser.add_argument('--summary', help='Also write issue counts by issue_code, product_category and base_uom '
+                                          'to this .csv or .parquet file.')
+    parser.add_argument('--summary-only', action='store_true', help='Write only the --summary file, no issue detail.')
+    parser.add_argument('--fused', action='store_true', help='Evaluate row-local rules in a single fused pass.')
+    parser.add_argument('--sample', type=float,
+                        help='Preview mode. Validate this fraction of materials, stratified by product category and '
+                             'UOM ladder depth, and print estimated issue counts instead of writing issues.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for --sample.')
+    parser.add_argument('--snapshot', help='Read material_data from a .parquet or .csv snapshot instead of Snowflake.')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='Run continuously, polling the change log every SECONDS and writing new/resolved issues. '
+                             'DUPLICATE_UPC only reads the MEAN rows sharing a UPC with the batch.')
+    parser.add_argument('--change-log', help='Change log table (change_id, material_number) polled by --watch.')
+    parser.add_argument('--streams', help='Comma separated Snowflake streams on MARM/MEAN drained into the change log on every poll.')
+    parser.add_argument('--max-batch', type=int, default=1000, help='Most materials validated per --watch batch.')
+    parser.add_argument('--offset-file', default='watch_offset.txt',
+                        help='Last processed change_id for --watch. The open issues are kept beside it '
+                             '(<offset-file>_open_issues.parquet).')
+    parser.add_argument('--open-issues',
+                        help='Issue output of the last full run (.csv or .parquet) that --watch starts from, so its '
+                             'issues can be resolved. Replaces the open issues kept beside --offset-file.')
+    parser.add_argument('--driver', choices=['auto', 'arrow', 'odbc'],
+                        help='Extract driver. arrow fetches Arrow batches with snowflake-connector-python, '
+                             'odbc uses pyodbc. Default: Snowflake_Extract_Driver environment variable, then auto.')
+    parser.add_argument('--memory-budget',
+                        help='Memory budget for the cross-material DUPLICATE_UPC check, e.g. 512MB. MEAN is read in '
+                             'chunks and spilled to hash-partitioned files on disk once the budget is exceeded.')
+    parser.add_argument('--spill-dir', help='Directory for --memory-budget spill files. Default: system temp directory.')
+    parser.add_argument('--catalog', help='Comma separated vendor catalog files (.parquet or .csv with material_number, '
+                                          'alt_uom and upc) checked for duplicate UPCs together with MEAN.')
+    parser.add_argument('--merkle',
+                        help='Write the Merkle packaging-level file (one row per material with EA/PKG/PKG2/CS/PAL '
+                             'columns and flags) to this .csv or .parquet file instead of validating.')
+    parser.add_argument('--list-rules', action='store_true', help='Print the selected rules and exit.')
+
+    args = parser.parse_args(argv)
+    if args.watch and not args.change_log:
+        parser.error('--watch requires --change-log')
+    if args.summary_only and not args.summary:
+        parser.error('--summary-only requires --summary')
+    if args.catalog and not args.memory_budget:
+        parser.error('--catalog requires --memory-budget')
+    if args.sample is not None and not 0 < args.sample <= 1:
+        parser.error('--sample must be a fraction in (0, 1]')
+
+    try:
+        select_rules(split_arg(args.rules), split_arg(args.category))
+        material_filter(args.materials)
+    except ValueError as error:
+        parser.error(str(error))
+
+    return args
+
+
+def extract_material_data(rules: list, materials: str | None = None, sample: float | None = None, seed: int = 0,
+                          extra_columns: list | None = None) -> tuple:
+    """
+    Pulls only the columns and rows the selected rules need from Snowflake.
+        :param rules: Rules that will be evaluated.
+        :param materials: Raw --materials argument.
+        :param sample: Fraction of materials to draw per stratum. None extracts every material.
+        :param seed: Sample seed.
+        :param extra_columns: Columns to extract in addition to those the rules read.
+        :return: (pd.DataFrame of material_data, pd.DataFrame of sampled materials or None)
+    """
+    from extract import open_source
+
+    columns = required_columns(rules, extra_columns)
+    filters = [predicate for predicate in (row_filter(rules),) if predicate]
+
+    material_predicate, params = material_filter(materials)
+    if material_predicate:
+        filters.append(material_predicate)
+
+    dtype = {col: material_dtypes[col] for col in columns}
+    sample_df = None
+
+    with open_source() as source:
+        if sample:
+            sample_sql = material_sample(sample, seed, filters=[material_predicate] if material_predicate else None)
+            sample_df = source.read(sample_sql, params, dtype={'material_number': 'string', 'product_category': 'string'})
+            filters.append(f'LTRIM(mara.matnr, 0) IN (SELECT "material_number" FROM ({sample_sql}))')
+            params = params + params
+
+        sql = material_query(columns=columns, filters=filters)
+        material_df = source.read(sql, params, dtype=dtype)
+
+    return material_df, sample_df
+
+
+def material_mask(material_numbers, value: str | list):
+    """
+    Applies the --materials argument to material numbers already in memory, the way material_filter() does in SQL.
+        :param material_numbers: pd.Series of material numbers.
+        :param value: Raw --materials argument or list of material numbers.
+        :return: Boolean pd.Series, True for the requested materials.
+    """
+    import pandas as pd
+
+    predicate, params = material_filter(value)
+    numbers = material_numbers.astype('string').str.lstrip('0')
+
+    if predicate.startswith('TRY_TO_NUMBER'):
+        return pd.to_numeric(numbers, errors='coerce').between(*params).fillna(False).astype(bool)
+
+    return numbers.isin(params).fillna(False).astype(bool)
+
+
+def load_snapshot(path: str, sample: float | None = None, seed: int = 0, materials: str | None = None) -> tuple:
+    """
+    Reads a material_data snapshot and optionally draws the same stratified sample as Snowflake would.
+        :param path: .parquet or .csv file with the material_data columns.
+        :param sample: Fraction of materials to draw per stratum. None keeps every material.
+        :param materials: Raw --materials argument. Only these materials are kept.
+        :param seed: Sample seed.
+        :return: (pd.DataFrame of material_data, pd.DataFrame of sampled materials or None)
+    """
+    import pandas as pd
+    from sampling import material_strata, stratified_sample
+
+    if path.endswith('.parquet'):
+        material_df = pd.read_parquet(path)
+    else:
+        material_df = pd.read_csv(path, dtype={col: 'string' for col, dtype in material_dtypes.items() if dtype == 'string'})
+    material_df = material_df.astype({col: dtype for col, dtype in material_dtypes.items() if col in material_df.columns})
+
+    if materials:
+        material_df = material_df[material_mask(material_df['material_number'], materials)].reset_index(drop=True)
+
+    if not sample:
+        return material_df, None
+
+    sample_df = stratified_sample(material_strata(material_df), sample, seed)
+
+    return material_df[material_df['material_number'].isin(sample_df['material_number'])].reset_index(drop=True), sample_df
+
+
+def duplicate_upc_data(memory_budget: str, spill_dir: str | None = None, catalogs: list | None = None):
+    """
+    Finds duplicate UPCs across MEAN and vendor catalogs without holding them in memory at once.
+        :return: pd.DataFrame for unique_upc(duplicate_upc_df=...)
+    """
+    from itertools import chain
+
+    from extract import open_source
+    from queries import mean_upc
+    from spill import catalog_chunks, duplicate_upcs
+
+    with open_source() as source:
+        chunks = chain(source.read_chunks(mean_upc, dtype='string'),
+                       *(catalog_chunks(path) for path in catalogs or []))
+        return duplicate_upcs(chunks, memory_budget, spill_dir)
+
+
+def batch_duplicate_upcs(source, materials: list):
+    """
+    Duplicate UPCs for unique_upc() on a --watch batch: only MEAN rows sharing a UPC with the
+    batch are read, instead of the catalog-wide duplicate_upc query on every poll.
+        :param source: Open extract.Source.
+        :param materials: Material numbers in the batch.
+        :return: pd.DataFrame for unique_upc(duplicate_upc_df=...)
+    """
+    from queries import batch_mean_upc
+    from spill import bucket_duplicates
+
+    materials = [material.lstrip('0') for material in materials]
+
+    return bucket_duplicates(source.read(batch_mean_upc(len(materials)), materials, dtype='string'))
+
+
+def evaluate(rules: list, material_df, fused: bool = False, overrides: dict | None = None):
+    """
+    Runs the rules and yields each issue DataFrame as soon as it is produced.
+        :param overrides: Extra keyword arguments per rule name, e.g. {'unique_upc': {'duplicate_upc_df': ...}}.
+    """
+    overrides = overrides or {}
+
+    if fused:
+        from fused import FUSED_RULES, run_fused
+
+        yield from run_fused(material_df, [rule for rule in rules if rule in FUSED_RULES])
+        rules = [rule for rule in rules if rule not in FUSED_RULES]
+
+    for rule in rules:
+        yield rule.run(material_df, **overrides.get(rule.name, {}))
+
+
+def main(argv: list | None = None):
+    args = parse_args(argv)
+    rules = select_rules(split_arg(args.rules), split_arg(args.category))
+
+    if args.list_rules:
+        for rule in rules:
+            print(f'{rule.name:<30} {rule.issue_code:<28} {rule.issue_category:<14} {rule.scope}')
+        return
+
+    if args.driver:
+        os.environ['Snowflake_Extract_Driver'] = args.driver
+
+    if args.watch:
+        watch(args, rules)
+        return
+
+    if args.merkle:
+        write_merkle(args)
+        return
+
+    if args.snapshot:
+        material_df, sample_df = load_snapshot(args.snapshot, args.sample, args.seed, args.materials)
+    else:
+        extra_columns = ['product_category', 'base_uom'] if args.summary else None
+        material_df, sample_df = extract_material_data(rules, args.materials, args.sample, args.seed, extra_columns)
+
+    overrides = {}
+    if args.memory_budget and any(rule.name == 'unique_upc' for rule in rules):
+        overrides['unique_upc'] = {'duplicate_upc_df': duplicate_upc_data(args.memory_budget, args.spill_dir,
+                                                                          split_arg(args.catalog))}
+
+    if args.sample:
+        import pandas as pd
+        from sampling import estimate_issue_counts
+
+        response_array = list(evaluate(rules, material_df, args.fused, overrides))
+        issue_df = pd.concat(response_array) if response_array else pd.DataFrame()
+        print(f'Sampled {len(sample_df)} materials across '
+              f'{len(sample_df.drop_duplicates(["product_category", "ladder_depth"]))} strata')
+        print(estimate_issue_counts(issue_df, sample_df).to_string(index=False))
+        return
+
+    from sinks import TeeSink, open_sink
+
+    sinks = [] if args.summary_only else [open_sink(args.output, table=args.table)]
+    if args.summary:
+        from rollup import RollupSink
+
+        sinks.append(RollupSink(material_df, args.summary))
+
+    with TeeSink(*sinks) as sink:
+        for issue_df in evaluate(rules, material_df, args.fused, overrides):
+            sink.write(issue_df)
+
+
+def write_merkle(args: argparse.Namespace) -> None:
+    """
+    Computes the Merkle packaging-level flags in-house. Every row of every selected material is needed,
+    so no rule projection or row filter is pushed down.
+    """
+    from merkle import merkle_output
+    from queries import material_columns
+
+    if args.snapshot:
+        material_df, _ = load_snapshot(args.snapshot, args.sample, args.seed, args.materials)
+    else:
+        material_df, _ = extract_material_data([], args.materials, args.sample, args.seed, list(material_columns))
+
+    merkle_df = merkle_output(material_df)
+    if args.merkle.endswith('.parquet'):
+        merkle_df.to_parquet(args.merkle, index=False)
+    else:
+        merkle_df.to_csv(args.merkle, index=False)
+    print(f'{len(merkle_df)} materials, {(merkle_df["DC_Ready"] == "Yes").sum()} DC ready')
+
+
+def watch(args: argparse.Namespace, rules: list) -> None:
+    """
+    Continuous validation: changed materials are validated in micro-batches and only
+    issue deltas are written. Stops on Ctrl+C after flushing the open batch.
+    """
+    import pandas as pd
+    import pyodbc as odbc
+    from extract import open_source
+    from sinks import open_sink
+    from watch import ChangeLogFeed, Watcher, load_issues
+
+    def validate(materials: list) -> pd.DataFrame:
+        material_df, _ = extract_material_data(rules, materials)
+        overrides = {}
+        if any(rule.name == 'unique_upc' for rule in rules):
+            with open_source() as source:
+                overrides['unique_upc'] = {'duplicate_upc_df': batch_duplicate_upcs(source, materials)}
+        response_array = list(evaluate(rules, material_df, args.fused, overrides))
+        return pd.concat(response_array) if response_array else pd.DataFrame()
+
+    offset = Watcher.load_offset(args.offset_file)
+    # Resuming from --offset-file: deltas written before the restart must stay in the output.
+    with odbc.connect(os.environ.get('Snowflake_Connection_String')) as con, \
+            open_sink(args.output, table=args.table, append=offset > 0) as sink:
+        feed = ChangeLogFeed(con, args.change_log, split_arg(args.streams), offset)
+        watcher = Watcher(feed, validate, sink, interval=args.watch, max_batch=args.max_batch,
+                          offset_path=args.offset_file,
+                          open_issues=load_issues(args.open_issues) if args.open_issues else None)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            watcher.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,362 @@
+import numpy as np
+import pandas as pd
+
+from fused import GTIN_PATTERN
+
+
+LEVELS = ['EA', 'PKG', 'PKG2', 'CS', 'PAL']
+
+# Level names used in the flag column headers. PKG2 has level columns but no flags.
+LEVEL_NAMES = {'EA': 'Each', 'PKG': 'Inner Pack', 'CS': 'Case', 'PAL': 'Pallet'}
+
+LEVEL_ATTRIBUTES = ['QTY_OF_UOM', 'LENGTH_', 'WIDTH_', 'HEIGHT_', 'WEIGHT_', 'UPC', 'VOLUM', 'PACKAGING_LEVEL']
+
+HEADER_COLUMNS = ['HDS SKU #', 'SAP_CREATED_DATE', 'Internal Supplier Part #', 'DESCRIPTION', 'HDS_SUPPLIER_NUMBER',
+                  'HDS_SUPPLIER_NAME', 'ProductHierarchy', 'MCAT', 'PCAT', 'ORDER_UNIT', 'EINA_PIR_QTY', 'EINA_UMREN',
+                  'BASE_MARM_UMREN', 'BASE_QTY_OF_UOM', 'MATTYPE', 'GENITEMCAT', 'BUOM', 'AUOM', 'LENGTH_', 'WIDTH_',
+                  'HEIGHT_', 'WEIGHT_', 'UPC', 'VOLUM', 'BASE_QUANTITY']
+
+FLAG_COLUMNS = ['MATRN_Duplicate', 'CONCAT_Error_Msg', 'Base_UOM_missing', 'Base_QTY_missing',
+                'Base_UPC_duplicate_found', 'Base_UPC_missing', 'Base_UPC_invalid', 'Base_Level_dimensions_missing',
+                'Base_weight_missing', 'Each_Level_data_missing', 'Each QTY > 1', 'Each dims = 0', 'Each weight = 0',
+                'Each_UPC_is_blank_or_0', 'Each_UPC_duplicate_found', 'Each_UPC_invalid',
+                'Each_Level_packaging_format_incorrect', 'Inner_Pack_Level_data_missing', 'Inner Pack QTY = 0',
+                'Inner Pack QTY = 1', 'Inner Pack dims = 0', 'Inner Pack dims = Each dims',
+                'Inner Pack dims < Each dims', 'Inner Pack weight = 0', 'Inner Pack weight = Each weight',
+                'Inner_Pack_weight_incorrect', 'Inner_Pack_UPC_is_blank_or_0', 'Inner_Pack_UPC_duplicate_found',
+                'Inner_Pack_UPC_invalid', 'Inner Pack UPC = Each UPC', 'Inner_Pack_Level_packaging_format_incorrect',
+                'Case_Level_data_missing', 'Case QTY = 0', 'Case QTY = 1', 'Case QTY = Inner Pack QTY',
+                'Case dims = 0', 'Case dims = Each dims', 'Case dims = Inner Pack dims', 'Case dims < Each dims',
+                'Case dims < Inner Pack dims', 'Case weight = 0', 'Case weight = Each weight',
+                'Case weight =  Inner Pack weight', 'Case_weight_incorrect', 'Case_UPC_is_blank_or_0',
+                'Case_UPC_duplicate_found', 'Case_UPC_invalid', 'Case UPC = Each UPC', 'Case UPC = Inner Pack UPC',
+                'Case_Level_packaging_format_incorrect', 'Pallet_Level_data_missing', 'Pallet QTY = 0',
+                'Pallet QTY = 1', 'Pallet QTY = Case QTY', 'Pallet dims = 0', 'Pallet dims = Each dims',
+                'Pallet dims = Inner Pack dims', 'Pallet dims = Case dims', 'Pallet dims < Each dims',
+                'Pallet dims < Inner Pack dims', 'Pallet dims < Case dims', 'Pallet weight = 0',
+                'Pallet weight = Each weight', 'Pallet weight = Inner Pack weight', 'Pallet weight = Case weight',
+                'Pallet_weight_incorrect', 'Pallet_UPC_duplicate_found', 'Pallet_UPC_invalid',
+                'Pallet UPC = Each UPC', 'Pallet UPC = Inner Pack UPC', 'Pallet UPC = Case UPC',
+                'Pallet_Level_packaging_format_incorrect', 'Requires Case level', 'Data_missing_for_all_levels',
+                'Duplicate_UPC_at_all_levels', 'UOM_and_PKG_Qty_mismatch', 'AUOM data < BUOM data',
+                'HDS SKU# duplicate found', 'Base dims = 1', 'Each dims = 1', 'Inner Pack dims = 1',
+                'Inner_Pack_QTY_is_incorrect', 'Case dims = 1', 'Case_QTY_is_incorrect', 'Pallet dims = 1',
+                'Pallet_QTY_is_incorrect', 'Pallet_dims_seem_high']
+
+MERKLE_COLUMNS = (HEADER_COLUMNS
+                  + [f'{level}_{attribute}' for level in LEVELS for attribute in LEVEL_ATTRIBUTES]
+                  + FLAG_COLUMNS + ['DC_Ready'])
+
+# The Merkle header has a double space in this one column.
+FLAG_ALIASES = {'Case weight = Inner Pack weight': 'Case weight =  Inner Pack weight'}
+
+# Largest pallet the Merkle file accepts, longest side first, in the units of marm.laeng/breit/hoehe (inches):
+# no side longer than a 53 ft trailer and the shortest side at most 60 in.
+PALLET_LIMITS = (636.0, 636.0, 60.0)
+
+FLAG_VALUE = 'Yes'
+
+# Flag columns left empty. Merkle accepts pallets straight on an each or inner pack (EA+PAL,
+# PKG+PAL), so a missing case level alone is no fault, and a CS base unit without a CS row is
+# already Base_QTY_missing. No rule that could fire on its own is known for these.
+UNCOMPUTED_FLAGS = ['Requires Case level']
+
+
+class LevelMatrix:
+    """
+    material_data pivoted to one row per material and one array per (attribute, level).
+    Rows are scattered into (level, material) arrays, so every cross-level comparison
+    is a whole-array numpy operation. Alternate UOMs map to levels by code: EA, CS and
+    PAL are their own levels and any other UOM is an inner pack, PKG for the smallest
+    and PKG2 for the next; further inner packs have no Merkle columns and are dropped.
+    Absent levels hold NaN (numbers) or None (UPC, UOM). The base dict holds the same
+    attributes for the row whose alt_uom is the base_uom. Levels below the base level,
+    such as the EA of a CS-based material, are listed but not validated, and a UPC is a
+    duplicate when another validated level of the same material carries it.
+        :param df: material_data DataFrame with every material_columns column.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = df[df['material_number'].notna() & df['alt_uom'].notna()]
+        material_index, self.materials = pd.factorize(df['material_number'])
+        self.size = len(self.materials)
+
+        numerator = df['conversion_numerator'].to_numpy(dtype=float, na_value=np.nan)
+        denominator = df['conversion_denominator'].to_numpy(dtype=float, na_value=np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            qty = numerator / denominator
+            whole_qty = np.fmod(numerator, denominator) == 0
+
+        # Inner packs ranked by quantity: 1 -> PKG, 2 -> PKG2, anything larger has no level.
+        level = df['alt_uom'].map({'EA': 0, 'CS': 3, 'PAL': 4}).to_numpy(dtype=float, na_value=np.nan)
+        inner = np.isnan(level)
+        inner_rank = pd.Series(qty[inner]).groupby(material_index[inner]).rank(method='first')
+        level[inner] = inner_rank.where(inner_rank <= 2).to_numpy()
+
+        upc = df['upc'].astype('string[pyarrow]').str.strip()
+        upc_blank = (upc.isna() | upc.str.fullmatch('0*')).fillna(True).to_numpy(dtype=bool)
+        upc_codes, _ = pd.factorize(upc.where(~upc_blank))
+        upc_invalid = ~upc_blank & ~upc.str.match(GTIN_PATTERN).fillna(False).to_numpy(dtype=bool)
+        upc = upc.where(~upc_blank).to_numpy(dtype=object, na_value=None)
+
+        rows = {'qty': qty,
+                'whole_qty': whole_qty,
+                'length': df['length'].to_numpy(dtype=float, na_value=np.nan),
+                'width': df['width'].to_numpy(dtype=float, na_value=np.nan),
+                'height': df['height'].to_numpy(dtype=float, na_value=np.nan),
+                'weight': df['gross_weight'].to_numpy(dtype=float, na_value=np.nan),
+                'volume': df['volume'].to_numpy(dtype=float, na_value=np.nan),
+                'upc': upc,
+                'upc_blank': upc_blank,
+                'upc_invalid': upc_invalid,
+                'uom': df['alt_uom'].to_numpy(dtype=object, na_value=None),
+                'is_base': (df['alt_uom'] == df['base_uom']).fillna(False).to_numpy(dtype=bool)}
+
+        kept = ~np.isnan(level)
+        self.level_index, self.material_index = level[kept].astype(np.int64), material_index[kept]
+        self.present = self.scatter(np.ones(kept.sum(), dtype=bool))
+        for name, values in rows.items():
+            setattr(self, name, self.scatter(values[kept]))
+
+        base = rows.pop('is_base')
+        base_index = material_index[base]
+        self.base = {name: self.place(np.full(self.size, fill_value(values), dtype=values.dtype), base_index, values[base])
+                     for name, values in rows.items()}
+        self.base['present'] = self.place(np.zeros(self.size, dtype=bool), base_index, True)
+
+        has_base_level = self.is_base.any(axis=0)
+        base_level = np.where(has_base_level, self.is_base.argmax(axis=0), 0)
+        self.validated = self.present & (np.arange(len(LEVELS))[:, None] >= base_level)
+
+        # UPCs as factorized codes, -1 where blank, absent or unvalidated, so level comparisons are integer compares.
+        self.upc_code = self.place(np.full((len(LEVELS), self.size), -1), (self.level_index, self.material_index),
+                                   upc_codes[kept])
+        self.upc_code[~self.validated] = -1
+
+        named = [level for level, code in enumerate(LEVELS) if code in LEVEL_NAMES]
+        self.upc_duplicate = np.zeros_like(self.present)
+        for level in named:
+            for other in named:
+                if other != level:
+                    self.upc_duplicate[level] |= (self.upc_code[level] >= 0) & (self.upc_code[level] == self.upc_code[other])
+        self.base['upc_duplicate'] = has_base_level & self.upc_duplicate[base_level, np.arange(self.size)]
+        self.base['uom'] = self.place(np.full(self.size, None, dtype=object), material_index,
+                                      df['base_uom'].to_numpy(dtype=object, na_value=None))
+        self.base['product_category'] = self.place(np.full(self.size, None, dtype=object), material_index,
+                                                   df['product_category'].to_numpy(dtype=object, na_value=None))
+
+        # Materials listing an alt_uom twice, or carrying different base_uom/product_category values.
+        uom_codes, _ = pd.factorize(df['alt_uom'])
+        repeated = pd.Series(material_index * (uom_codes.max() + 1) + uom_codes).duplicated().to_numpy()
+        self.duplicate_uom = self.place(np.zeros(self.size, dtype=bool), material_index[repeated], True)
+        self.conflicting = np.zeros(self.size, dtype=bool)
+        for col in ('base_uom', 'product_category'):
+            codes, _ = pd.factorize(df[col], use_na_sentinel=False)
+            first = self.place(np.zeros(self.size, dtype=codes.dtype), material_index[::-1], codes[::-1])
+            self.conflicting[material_index[codes != first[material_index]]] = True
+
+    @staticmethod
+    def place(target: np.ndarray, index: np.ndarray, values) -> np.ndarray:
+        target[index] = values
+        return target
+
+    def scatter(self, values: np.ndarray) -> np.ndarray:
+        """
+        Places one value per kept row into a (level, material) array.
+        """
+        matrix = np.full((len(LEVELS), self.size), fill_value(values), dtype=values.dtype)
+        matrix[self.level_index, self.material_index] = values
+
+        return matrix
+
+    def dims(self, level: int) -> np.ndarray:
+        return np.stack([self.length[level], self.width[level], self.height[level]])
+
+
+def fill_value(values: np.ndarray):
+    """
+    Value of an absent level for an attribute array: NaN, False or None.
+    """
+    if values.dtype == bool:
+        return False
+
+    return np.nan if values.dtype.kind == 'f' else None
+
+
+def level_flags(m: LevelMatrix, weight_upper: float = 0.25, weight_lower: float = -0.05) -> dict:
+    """
+    Per-level and cross-level flags. Comparisons against an absent or unvalidated level are False.
+        :param weight_upper: How much heavier than base weight * quantity a level may be (larger_gross_weight_failure()).
+        :param weight_lower: How much lighter than base weight * quantity a level may be.
+        :return: dict of flag column -> bool array
+    """
+    flags = {}
+    base_weight = m.base['weight']
+    previous_qty = np.full(m.size, np.nan)
+    ladder_broken = np.zeros(m.size, dtype=bool)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for level, code in enumerate(LEVELS):
+            present = m.validated[level]
+            dims = m.dims(level)
+            qty = m.qty[level]
+
+            # Quantities must not shrink up the ladder and must nest evenly in the next level down.
+            ladder_broken |= present & (qty < previous_qty)
+            not_multiple = present & (previous_qty > 0) & (np.fmod(qty, previous_qty) != 0)
+            previous_qty = np.where(present, qty, previous_qty)
+
+            if code not in LEVEL_NAMES:
+                continue
+            name = LEVEL_NAMES[code]
+            snake = name.replace(' ', '_')
+
+            attributes = np.vstack([dims, [m.weight[level], m.volume[level], qty]])
+            flags[f'{snake}_Level_data_missing'] = present & np.isnan(attributes).any(axis=0)
+            flags[f'{name} QTY = 0'] = present & (qty == 0)
+            flags[f'{name} QTY = 1'] = present & (qty == 1) & ~m.is_base[level]
+            flags[f'{name} dims = 0'] = present & ((dims == 0) | np.isnan(dims)).any(axis=0)
+            flags[f'{name} dims = 1'] = present & (dims == 1).all(axis=0)
+            flags[f'{name} weight = 0'] = present & ((m.weight[level] == 0) | np.isnan(m.weight[level]))
+            flags[f'{snake}_UPC_is_blank_or_0'] = present & m.upc_blank[level]
+            flags[f'{snake}_UPC_duplicate_found'] = m.upc_duplicate[level]
+            flags[f'{snake}_UPC_invalid'] = present & m.upc_invalid[level]
+            flags[f'{snake}_Level_packaging_format_incorrect'] = present & ~m.whole_qty[level]
+            flags[f'{snake}_QTY_is_incorrect'] = not_multiple
+
+            # Rounded so a weight exactly at a tolerance (19 lb for 40 x 0.38 lb) passes, as it does in the Merkle file.
+            expected = base_weight * qty
+            weight_diff = np.round((m.weight[level] - expected) / expected, 6)
+            flags[f'{snake}_weight_incorrect'] = present & (qty > 1) & ((weight_diff > weight_upper) | (weight_diff < weight_lower))
+
+            for lower_level, lower_code in enumerate(LEVELS[:level]):
+                if lower_code not in LEVEL_NAMES:
+                    continue
+                lower_name = LEVEL_NAMES[lower_code]
+                both = present & m.validated[lower_level]
+                lower_dims = m.dims(lower_level)
+
+                flags[f'{name} QTY = {lower_name} QTY'] = both & (qty == m.qty[lower_level])
+                flags[f'{name} dims = {lower_name} dims'] = both & (dims == lower_dims).all(axis=0)
+                flags[f'{name} dims < {lower_name} dims'] = both & (dims.prod(axis=0) < lower_dims.prod(axis=0))
+                flags[f'{name} weight = {lower_name} weight'] = both & (m.weight[level] == m.weight[lower_level])
+                flags[f'{name} UPC = {lower_name} UPC'] = both & (m.upc_code[level] >= 0) & (m.upc_code[level] == m.upc_code[lower_level])
+
+        flags['UOM_and_PKG_Qty_mismatch'] = ladder_broken
+
+    return {FLAG_ALIASES.get(column, column): values for column, values in flags.items()}
+
+
+def material_flags(m: LevelMatrix) -> dict:
+    """
+    Base unit and whole-material flags.
+        :return: dict of flag column -> bool array
+    """
+    base = m.base
+    base_dims = np.stack([base['length'], base['width'], base['height']])
+    flags = {}
+
+    flags['MATRN_Duplicate'] = m.duplicate_uom
+    flags['HDS SKU# duplicate found'] = m.conflicting
+
+    flags['Base_UOM_missing'] = pd.isna(base['uom'])
+    flags['Base_QTY_missing'] = ~base['present'] | np.isnan(base['qty'])
+    flags['Base_UPC_duplicate_found'] = base['present'] & base['upc_duplicate']
+    flags['Base_UPC_missing'] = base['present'] & base['upc_blank']
+    flags['Base_UPC_invalid'] = base['present'] & ~base['upc_blank'] & base['upc_invalid']
+    flags['Base_Level_dimensions_missing'] = base['present'] & ((base_dims == 0) | np.isnan(base_dims)).any(axis=0)
+    flags['Base_weight_missing'] = base['present'] & ((base['weight'] == 0) | np.isnan(base['weight']))
+    flags['Base dims = 1'] = base['present'] & (base_dims == 1).all(axis=0)
+
+    flags['Each QTY > 1'] = m.validated[0] & (m.qty[0] > 1)
+
+    with np.errstate(invalid='ignore'):
+        complete = m.validated & ~np.isnan(np.stack([m.length, m.width, m.height, m.weight, m.volume, m.qty])).any(axis=0)
+        flags['Data_missing_for_all_levels'] = ~complete.any(axis=0)
+
+        first_upc = m.upc_code[m.validated.argmax(axis=0), np.arange(m.size)]
+        same_upc = ((m.upc_code == first_upc) | ~m.validated).all(axis=0) & ~(m.validated & m.upc_blank).any(axis=0)
+        flags['Duplicate_UPC_at_all_levels'] = (m.validated.sum(axis=0) > 1) & same_upc
+
+        alt = m.validated & ~m.is_base & (m.qty > 1)
+        smaller = (m.volume < base['volume']) | (m.weight < base['weight'])
+        flags['AUOM data < BUOM data'] = (alt & smaller).any(axis=0)
+
+        pallet_dims = -np.sort(-m.dims(4), axis=0)
+        flags['Pallet_dims_seem_high'] = m.present[4] & (pallet_dims > np.array(PALLET_LIMITS)[:, None]).any(axis=0)
+
+    return flags
+
+
+def error_messages(flag_columns: list, flag_matrix: np.ndarray) -> np.ndarray:
+    """
+    CONCAT_Error_Msg: the set flag columns of each material joined by ', ', None when none is set.
+    Joined column-wise by pyarrow compute, so there is no Python call per material.
+        :param flag_columns: Flag column names, one per flag_matrix row.
+        :param flag_matrix: (flag, material) bool array.
+        :return: object array with one message or None per material.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    messages = np.full(flag_matrix.shape[1], None, dtype=object)
+    flagged = flag_matrix.any(axis=0)
+    parts = [pc.if_else(pa.array(flag_matrix[i, flagged]), pa.scalar(column), pa.scalar(None, pa.string()))
+             for i, column in enumerate(flag_columns) if flag_matrix[i].any()]
+    if parts:
+        messages[flagged] = pc.binary_join_element_wise(*parts, ', ', null_handling='skip').to_numpy(zero_copy_only=False)
+
+    return messages
+
+
+def merkle_output(df: pd.DataFrame, weight_upper: float = 0.25, weight_lower: float = -0.05) -> pd.DataFrame:
+    """
+    Computes the Merkle packaging-level file from material_data: one row per material,
+    the base UOM and EA/PKG/PKG2/CS/PAL level columns and every flag column, in the
+    column order of the Merkle output. Flags hold 'Yes' or are empty; DC_Ready is 'Yes'
+    when no flag is set. Columns Merkle takes from EINA and vendor master data are empty,
+    as are the UNCOMPUTED_FLAGS.
+    UPC duplicates are counted between the levels of a material; UPCs shared across
+    materials are reported by the unique_upc rule.
+        :param df: material_data DataFrame with every material_columns column.
+        :param weight_upper: Upper tolerance for the *_weight_incorrect flags.
+        :param weight_lower: Lower tolerance for the *_weight_incorrect flags.
+        :return: pd.DataFrame with MERKLE_COLUMNS.
+    """
+    m = LevelMatrix(df)
+    flags = {**material_flags(m), **level_flags(m, weight_upper, weight_lower)}
+    flag_columns = [column for column in FLAG_COLUMNS if column not in ['CONCAT_Error_Msg', *UNCOMPUTED_FLAGS]]
+    missing = set(flag_columns) - set(flags)
+    if missing:
+        raise ValueError(f'No flag computed for: {", ".join(sorted(missing))}')
+
+    flag_matrix = np.stack([flags[column] for column in flag_columns])
+
+    output = {'HDS SKU #': m.materials,
+              'PCAT': m.base['product_category'],
+              'BUOM': m.base['uom'],
+              'AUOM': m.base['uom'],
+              'LENGTH_': m.base['length'],
+              'WIDTH_': m.base['width'],
+              'HEIGHT_': m.base['height'],
+              'WEIGHT_': m.base['weight'],
+              'UPC': m.base['upc'],
+              'VOLUM': m.base['volume'],
+              'BASE_QTY_OF_UOM': m.base['qty']}
+
+    for level, code in enumerate(LEVELS):
+        output.update({f'{code}_QTY_OF_UOM': m.qty[level],
+                       f'{code}_LENGTH_': m.length[level],
+                       f'{code}_WIDTH_': m.width[level],
+                       f'{code}_HEIGHT_': m.height[level],
+                       f'{code}_WEIGHT_': m.weight[level],
+                       f'{code}_UPC': m.upc[level],
+                       f'{code}_VOLUM': m.volume[level],
+                       f'{code}_PACKAGING_LEVEL': m.uom[level]})
+
+    output.update({column: pd.Categorical.from_codes(flag_matrix[i].astype(np.int8) - 1, categories=[FLAG_VALUE])
+                   for i, column in enumerate(flag_columns)})
+    output['CONCAT_Error_Msg'] = error_messages(flag_columns, flag_matrix)
+    output['DC_Ready'] = np.where(flag_matrix.any(axis=0), 'No', 'Yes')
+
+    return pd.DataFrame(output).reindex(columns=MERKLE_COLUMNS)
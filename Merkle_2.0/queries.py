@@ -1,17 +1,36 @@
-material_data = """
-SELECT
-    LTRIM(mara.matnr, 0) AS "material_number",
-    product.prodcat AS "product_category",
-    mara.meins AS "base_uom",
-    marm.meinh AS "alt_uom",
-    marm.umrez AS "conversion_numerator",
-    marm.umren AS "conversion_denominator",
-    marm.ean11 AS "upc",
-    marm.laeng AS "length",
-    marm.breit AS "width",
-    marm.hoehe AS "height",
-    marm.volum AS "volume",
-    marm.brgew AS "gross_weight"
+material_columns = {
+    'material_number': 'LTRIM(mara.matnr, 0)',
+    'product_category': 'product.prodcat',
+    'base_uom': 'mara.meins',
+    'alt_uom': 'marm.meinh',
+    'conversion_numerator': 'marm.umrez',
+    'conversion_denominator': 'marm.umren',
+    'upc': 'marm.ean11',
+    'length': 'marm.laeng',
+    'width': 'marm.breit',
+    'height': 'marm.hoehe',
+    'volume': 'marm.volum',
+    'gross_weight': 'marm.brgew'
+}
+
+
+material_dtypes = {
+    'material_number': 'string',
+    'product_category': 'string',
+    'base_uom': 'string',
+    'alt_uom': 'string',
+    'conversion_numerator': 'int64',
+    'conversion_denominator': 'int64',
+    'upc': 'string',
+    'length': 'float64',
+    'width': 'float64',
+    'height': 'float64',
+    'volume': 'float64',
+    'gross_weight': 'float64'
+}
+
+
+material_from = """
 FROM
     edp.std_ecc.mara mara
 LEFT OUTER JOIN
@@ -23,19 +42,101 @@ LEFT OUTER JOIN
 LEFT OUTER JOIN
     EDP.STD_ENABLE.VW_EW_MATERIAL_PROD product
         ON LTRIM(eina.matnr, 0) = product.material_number
+""".strip()
+
+
+material_filters = [
+    "mara.mtpos_mara = 'ZNOR'",
+    "mara.mstae = 'RL'",
+    "mara.mstav IN ('RL', 'NW')",
+    "mara.mtart IN ('HAWA', 'HALB')",
+    "eina.relif = 'X'",
+    "eina.lifnr <> '2000500754'"
+]
+
+
+def material_query(columns: list | None = None, filters: list | None = None) -> str:
+    """
+    Builds the material_data extract. Joins and base filters are fixed, the
+    projection and any additional WHERE predicates are supplied by the caller.
+        :param columns: Output column labels from material_columns. Defaults to all columns.
+        :param filters: Extra SQL predicates AND-ed onto the base filters.
+        :return: SQL string.
+    """
+    columns = list(material_columns) if columns is None else columns
+    filters = material_filters + list(filters or [])
+
+    select = ',\n    '.join(f'{material_columns[col]} AS "{col}"' for col in columns)
+    where = '\n    AND '.join(filters)
+
+    return f"""
+SELECT
+    {select}
+{material_from}
 WHERE
-    mara.mtpos_mara = 'ZNOR'
-    AND mara.mstae = 'RL'
-    AND mara.mstav IN ('RL', 'NW')
-    AND mara.mtart IN ('HAWA', 'HALB')
-    AND eina.relif = 'X'
-    AND eina.lifnr <> '2000500754'
+    {where}
 ORDER BY
     LTRIM(mara.matnr, 0),
     marm.umrez
 """
 
 
+material_data = material_query()
+
+
+def material_sample(fraction: float, seed: int = 0, filters: list | None = None) -> str:
+    """
+    Draws a stratified sample of materials, stratified by product_category and
+    UOM ladder depth (number of distinct UOMs). Every stratum keeps at least one
+    material. Ordering by a seeded hash makes the sample repeatable, so the same
+    SQL can be embedded as a sub-query filter of material_query().
+        :param fraction: Share of materials to keep in each stratum (0, 1].
+        :param seed: Sample seed.
+        :param filters: Extra SQL predicates AND-ed onto the base filters.
+        :return: SQL string | material_number | product_category | ladder_depth | stratum_size |
+    """
+    fraction, seed = float(fraction), int(seed)
+    where = '\n    AND '.join(material_filters + list(filters or []))
+
+    return f"""
+WITH CTE_MATERIALS
+AS
+(
+SELECT
+    LTRIM(mara.matnr, 0) AS material_number,
+    MAX(product.prodcat) AS product_category,
+    COUNT(DISTINCT marm.meinh) AS ladder_depth
+{material_from}
+WHERE
+    {where}
+GROUP BY
+    LTRIM(mara.matnr, 0)
+),
+CTE_STRATA
+AS
+(
+SELECT
+    material_number,
+    product_category,
+    ladder_depth,
+    COUNT(*) OVER (PARTITION BY product_category, ladder_depth) AS stratum_size,
+    ROW_NUMBER() OVER (PARTITION BY product_category, ladder_depth ORDER BY HASH(material_number, {seed})) AS stratum_rank
+FROM
+    CTE_MATERIALS
+)
+
+SELECT
+    material_number AS "material_number",
+    product_category AS "product_category",
+    ladder_depth AS "ladder_depth",
+    stratum_size AS "stratum_size"
+FROM
+    CTE_STRATA
+WHERE
+    stratum_rank <= GREATEST(1, CEIL(stratum_size * {fraction}))
+"""
+
+
 duplicate_upc = """
 WITH CTE_DUPLICATE_UPC
 AS
@@ -61,3 +162,49 @@ INNER JOIN
 ORDER BY
     mean.ean11
 """
+
+
+def batch_mean_upc(materials: int) -> str:
+    """
+    MEAN rows sharing a UPC with any unit of the given materials, so a --watch batch's
+    duplicate UPCs are found without reading the whole catalog.
+        :param materials: Number of material number parameters (LTRIM-ed, as in the change log).
+        :return: SQL string | material_number | alt_uom | upc |
+    """
+    placeholders = ', '.join('?' for _ in range(materials))
+
+    return f"""
+WITH CTE_BATCH_UPC
+AS
+(
+SELECT DISTINCT
+    ean11
+FROM
+    edp.std_ecc.mean
+WHERE
+    LTRIM(matnr, 0) IN ({placeholders})
+    AND ean11 IS NOT NULL
+)
+
+SELECT
+    LTRIM(mean.matnr, 0) AS "material_number",
+    mean.meinh AS "alt_uom",
+    mean.ean11 AS "upc"
+FROM
+    edp.std_ecc.mean mean
+INNER JOIN
+    CTE_BATCH_UPC batch
+        ON mean.ean11 = batch.ean11
+"""
+
+
+mean_upc = """
+SELECT
+    LTRIM(mean.matnr, 0) AS "material_number",
+    mean.meinh AS "alt_uom",
+    mean.ean11 AS "upc"
+FROM
+    edp.std_ecc.mean mean
+WHERE
+    mean.ean11 IS NOT NULL
+"""
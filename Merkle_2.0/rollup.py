@@ -0,0 +1,55 @@
+from collections import Counter
+
+import pandas as pd
+
+from sinks import Sink
+
+
+ROLLUP_DIMENSIONS = ['issue_code', 'product_category', 'base_uom']
+
+
+class RollupSink(Sink):
+    """
+    Keeps running issue counts by issue_code x product_category x base_uom as rule
+    results arrive, so a summary is available without keeping the detail rows.
+    Memory grows with the number of distinct groups, not the number of issues.
+        :param material_df: material_data the rules ran on, used to look up product_category and base_uom.
+        :param output: Summary file (.csv or .parquet) written on close. None keeps it in memory only.
+    """
+
+    def __init__(self, material_df: pd.DataFrame, output: str | None = None):
+        self.lookup = (material_df[['material_number', 'product_category', 'base_uom']]
+                       .drop_duplicates(subset='material_number')
+                       .set_index('material_number'))
+        self.output = output
+        self.counts = Counter()
+
+    def _write(self, df: pd.DataFrame) -> None:
+        attributes = self.lookup.reindex(df['material_number'].to_numpy())
+        chunk = pd.DataFrame({'issue_code': df['issue_code'].to_numpy(),
+                              'product_category': attributes['product_category'].to_numpy(),
+                              'base_uom': attributes['base_uom'].to_numpy()})
+
+        # NaN keys never compare equal, so missing values are counted under '' and restored in summary().
+        chunk = chunk.astype(object).fillna('')
+        self.counts.update(chunk.groupby(ROLLUP_DIMENSIONS).size().to_dict())
+
+    def summary(self) -> pd.DataFrame:
+        """
+        :return: pd.DataFrame | issue_code | product_category | base_uom | issue_count |
+        """
+        summary_df = pd.DataFrame([(*key, count) for key, count in self.counts.items()],
+                                  columns=ROLLUP_DIMENSIONS + ['issue_count'])
+        summary_df[ROLLUP_DIMENSIONS] = summary_df[ROLLUP_DIMENSIONS].replace('', None)
+
+        return summary_df.sort_values(ROLLUP_DIMENSIONS, na_position='last').reset_index(drop=True)
+
+    def close(self) -> None:
+        if self.output is None:
+            return
+
+        summary_df = self.summary()
+        if self.output.endswith('.parquet'):
+            summary_df.to_parquet(self.output, index=False)
+        else:
+            summary_df.to_csv(self.output, index=False)
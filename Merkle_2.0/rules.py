@@ -0,0 +1,234 @@
+from dataclasses import dataclass, field
+from functools import partial
+from importlib import import_module
+
+from queries import material_columns
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    Metadata for a single validation rule in stored_procedures.py.
+    Kept free of pandas/pyodbc so the registry can be listed without importing them.
+        :param name: Unique rule name used on the command line.
+        :param function: Name of the function in stored_procedures.py.
+        :param issue_code: Short form code identifying the issue type.
+        :param issue_category: Owner of the issue's resolution.
+        :param columns: material_data columns read by the rule.
+        :param scope: 'row' if each row is evaluated on its own, 'material' if rows are compared
+                      within a material_number, 'catalog' if rows are compared across materials.
+        :param where: SQL predicate selecting every row the rule could flag. None if the rule needs all rows.
+        :param kwargs: Extra keyword arguments passed to the function.
+    """
+    name: str
+    function: str
+    issue_code: str
+    issue_category: str
+    columns: tuple
+    scope: str
+    where: str | None = None
+    kwargs: dict = field(default_factory=dict)
+
+    def load(self):
+        """
+        Imports stored_procedures on first use and returns the bound rule function.
+        """
+        module = import_module('stored_procedures')
+        return partial(getattr(module, self.function), **self.kwargs)
+
+    def run(self, df, **kwargs):
+        """
+        Evaluates the rule against a material_data DataFrame.
+        Keyword arguments are passed to the rule function on top of the registry kwargs.
+        """
+        return self.load()(df, **kwargs)
+
+
+ALT_UOM_WITH_QTY = 'mara.meins <> marm.meinh AND marm.umrez > 1'
+
+
+RULES = [
+    Rule(name='package_dimensions',
+         function='package_dimensions',
+         issue_code='INVALID_DIMENSIONS',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'length', 'width', 'height'),
+         scope='row',
+         where=ALT_UOM_WITH_QTY),
+    Rule(name='blank_numerator',
+         function='is_blank_or_zero',
+         issue_code='BLANK_NUM',
+         issue_category='SUPPLY_CHAIN',
+         columns=('conversion_numerator',),
+         scope='row',
+         where='COALESCE(marm.umrez, 0) = 0',
+         kwargs={'column_label': 'conversion_numerator',
+                 'issue_code': 'BLANK_NUM',
+                 'error_message': 'Numerator cannot be blank or zero.'}),
+    Rule(name='blank_denominator',
+         function='is_blank_or_zero',
+         issue_code='BLANK_DENOM',
+         issue_category='SUPPLY_CHAIN',
+         columns=('conversion_denominator',),
+         scope='row',
+         where='COALESCE(marm.umren, 0) = 0',
+         kwargs={'column_label': 'conversion_denominator',
+                 'issue_code': 'BLANK_DENOM',
+                 'error_message': 'Denominator cannot be blank or zero.'}),
+    Rule(name='is_alt_uom_volume_zero',
+         function='is_alt_uom_volume_zero',
+         issue_code='MISSING_VOLUME',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'volume'),
+         scope='row',
+         where=f'{ALT_UOM_WITH_QTY} AND COALESCE(marm.volum, 0) = 0'),
+    Rule(name='smaller_alt_volume',
+         function='smaller_alt_volume',
+         issue_code='INVALID_VOLUME',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_denominator', 'volume'),
+         scope='material'),
+    Rule(name='larger_alt_volume',
+         function='larger_alt_volume',
+         issue_code='INVALID_VOLUME',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'volume'),
+         scope='material'),
+    Rule(name='is_alt_uom_weight_zero',
+         function='is_alt_uom_weight_zero',
+         issue_code='MISSING_WEIGHT',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'gross_weight'),
+         scope='row',
+         where=f'{ALT_UOM_WITH_QTY} AND COALESCE(marm.brgew, 0) = 0'),
+    Rule(name='missing_alternate_uom',
+         function='missing_alternate_uom',
+         issue_code='MISSING_AUOM',
+         issue_category='SUPPLY_CHAIN',
+         columns=('product_category', 'base_uom', 'alt_uom', 'conversion_numerator',
+                  'conversion_denominator', 'gross_weight'),
+         scope='material'),
+    Rule(name='invalid_numerator',
+         function='invalid_numerator',
+         issue_code='INVALID_NUMERATOR',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'volume', 'gross_weight'),
+         scope='material'),
+    Rule(name='duplicate_alt_uoms',
+         function='duplicate_alt_uoms',
+         issue_code='DUPLICATE_AUOMS',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'conversion_denominator'),
+         scope='material'),
+    Rule(name='alt_uom_mod',
+         function='alt_uom_mod',
+         issue_code='NON_DIVISIBLE_CONVERSION',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'conversion_denominator'),
+         scope='material'),
+    Rule(name='inv_conv_by_upc',
+         function='inv_conv_by_upc',
+         issue_code='INVALID_CONVERSION_BY_UPC',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'conversion_denominator', 'upc'),
+         scope='material'),
+    Rule(name='redundant_conversion',
+         function='redundant_conversion',
+         issue_code='INVALID_CONVERSION',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'conversion_denominator'),
+         scope='row',
+         where=f'{ALT_UOM_WITH_QTY} AND marm.umrez = marm.umren'),
+    Rule(name='pallet_case_fault_tolerance',
+         function='pallet_case_fault_tolerance',
+         issue_code='PALLET_VOLUME',
+         issue_category='SUPPLY_CHAIN',
+         columns=('alt_uom', 'conversion_numerator', 'volume'),
+         scope='material'),
+    Rule(name='smaller_gross_weight_failure',
+         function='smaller_gross_weight_failure',
+         issue_code='WEIGHT_TOLERANCE',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_denominator', 'gross_weight'),
+         scope='material'),
+    Rule(name='larger_gross_weight_failure',
+         function='larger_gross_weight_failure',
+         issue_code='WEIGHT_TOLERANCE',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'gross_weight'),
+         scope='material'),
+    Rule(name='invalid_gtin',
+         function='invalid_gtin',
+         issue_code='INVALID_UPC',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'conversion_denominator', 'upc'),
+         scope='row',
+         where='marm.ean11 IS NOT NULL'),
+    Rule(name='upc_required',
+         function='upc_required',
+         issue_code='NO_UPC',
+         issue_category='SUPPLY_CHAIN',
+         columns=('base_uom', 'alt_uom', 'conversion_numerator', 'conversion_denominator', 'upc'),
+         scope='row',
+         where='marm.ean11 IS NULL'),
+    Rule(name='unique_upc',
+         function='unique_upc',
+         issue_code='DUPLICATE_UPC',
+         issue_category='SUPPLY_CHAIN',
+         columns=(),
+         scope='catalog')
+]
+
+
+def select_rules(names: list | None = None, categories: list | None = None) -> list:
+    """
+    Filters the registry by rule name/issue code and issue category.
+        :param names: Rule names or issue codes to keep. None keeps every rule.
+        :param categories: Issue categories to keep. None keeps every category.
+        :return: list of Rule in registry order.
+    """
+    if names:
+        unknown = set(names) - {rule.name for rule in RULES} - {rule.issue_code for rule in RULES}
+        if unknown:
+            raise ValueError(f'Unknown rule(s): {", ".join(sorted(unknown))}')
+
+    if categories:
+        unknown = set(categories) - {rule.issue_category for rule in RULES}
+        if unknown:
+            raise ValueError(f'Unknown issue categories: {", ".join(sorted(unknown))}')
+
+    selected = []
+
+    for rule in RULES:
+        if names and rule.name not in names and rule.issue_code not in names:
+            continue
+        if categories and rule.issue_category not in categories:
+            continue
+        selected.append(rule)
+
+    return selected
+
+
+def required_columns(rules: list, extra_columns: list | None = None) -> list:
+    """
+    Returns the material_data columns needed to evaluate the rules. material_number
+    and alt_uom are always included since every issue is keyed on them.
+    """
+    needed = {'material_number', 'alt_uom', *(extra_columns or [])}
+    for rule in rules:
+        needed.update(rule.columns)
+
+    return [col for col in material_columns if col in needed]
+
+
+def row_filter(rules: list) -> str | None:
+    """
+    Builds a SQL predicate that keeps only rows the rules could flag.
+    Returns None when any rule needs every row of a material.
+    """
+    if not rules or any(rule.where is None for rule in rules):
+        return None
+
+    predicates = list(dict.fromkeys(rule.where for rule in rules))
+
+    return '(' + ' OR '.join(f'({predicate})' for predicate in predicates) + ')'
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+
+STRATA = ['product_category', 'ladder_depth']
+
+
+def material_strata(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Assigns each material in a material_data snapshot to its sampling stratum.
+    Mirrors queries.material_sample() for runs that read a snapshot instead of Snowflake.
+        :param df: material_data DataFrame.
+        :return: pd.DataFrame | material_number | product_category | ladder_depth | stratum_size |
+    """
+    strata_df = (df.groupby('material_number', as_index=False)
+                 .agg(product_category=('product_category', 'max'),
+                      ladder_depth=('alt_uom', 'nunique')))
+    strata_df['stratum_size'] = strata_df.groupby(STRATA, dropna=False)['material_number'].transform('size')
+
+    return strata_df
+
+
+def stratified_sample(strata_df: pd.DataFrame, fraction: float, seed: int = 0) -> pd.DataFrame:
+    """
+    Keeps ceil(stratum_size * fraction) materials from every stratum, at least one each.
+        :param strata_df: Output of material_strata().
+        :param fraction: Share of materials to keep in each stratum (0, 1].
+        :param seed: Sample seed.
+        :return: Sampled rows of strata_df.
+    """
+    rank = (strata_df.sample(frac=1, random_state=seed)
+            .groupby(STRATA, dropna=False)
+            .cumcount()
+            .reindex(strata_df.index))
+    keep = np.maximum(1, np.ceil(strata_df['stratum_size'] * fraction))
+
+    return strata_df[rank < keep].reset_index(drop=True)
+
+
+def estimate_issue_counts(issue_df: pd.DataFrame, sample_df: pd.DataFrame, z: float = 1.96) -> pd.DataFrame:
+    """
+    Stratified estimate of the full-run issue count per issue_code.
+    Each sampled material contributes the number of issue rows it produced; totals
+    are expanded by stratum_size / sampled materials in the stratum. Strata with a
+    single sampled material contribute no variance, so intervals are optimistic for
+    very small samples.
+        :param issue_df: Issues found for the sampled materials.
+        :param sample_df: Sampled materials with their strata (material_sample() or stratified_sample()).
+        :param z: Normal quantile of the confidence interval. 1.96 for 95%.
+        :return: pd.DataFrame | issue_code | sample_count | estimate | std_error | ci_low | ci_high |
+    """
+    columns = ['issue_code', 'sample_count', 'estimate', 'std_error', 'ci_low', 'ci_high']
+
+    if issue_df.empty:
+        return pd.DataFrame(columns=columns)
+
+    sampled = sample_df.drop_duplicates('material_number').set_index('material_number')
+    issue_df = issue_df[issue_df['material_number'].isin(sampled.index)]
+
+    counts = pd.crosstab(issue_df['material_number'], issue_df['issue_code'])
+    counts = counts.reindex(sampled.index, fill_value=0)
+
+    strata = pd.MultiIndex.from_frame(sampled[STRATA].astype(object).fillna('<NA>'))
+    grouped = counts.set_axis(strata).groupby(level=[0, 1])
+
+    stratum_size = sampled['stratum_size'].set_axis(strata).groupby(level=[0, 1]).first()
+    n = grouped.size()
+    mean = grouped.mean()
+    variance = grouped.var(ddof=1).fillna(0)
+
+    estimate = mean.mul(stratum_size, axis=0).sum()
+    variance = variance.mul(stratum_size ** 2 * (1 - n / stratum_size) / n, axis=0).sum()
+    std_error = np.sqrt(variance)
+    sample_count = counts.sum()
+
+    result = pd.DataFrame({'issue_code': counts.columns,
+                           'sample_count': sample_count.to_numpy(),
+                           'estimate': estimate.round().to_numpy(),
+                           'std_error': std_error.round(1).to_numpy(),
+                           'ci_low': np.maximum(sample_count, estimate - z * std_error).round().to_numpy(),
+                           'ci_high': (estimate + z * std_error).round().to_numpy()})
+
+    return result.sort_values('estimate', ascending=False).reset_index(drop=True)
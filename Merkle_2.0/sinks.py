@@ -0,0 +1,257 @@
+import bz2
+import gzip
+import lzma
+import os
+import queue
+import threading
+
+import pandas as pd
+
+
+ISSUE_COLUMNS = ['material_number',
+                 'alt_uom',
+                 'date_discovered',
+                 'date_resolved',
+                 'issue_category',
+                 'issue_code',
+                 'error_message']
+
+
+def issue_schema():
+    """
+    Arrow schema of the issue repository table, matching the output of utils.format_df().
+    """
+    import pyarrow as pa
+
+    return pa.schema([('material_number', pa.string()),
+                      ('alt_uom', pa.string()),
+                      ('date_discovered', pa.date32()),
+                      ('date_resolved', pa.date32()),
+                      ('issue_category', pa.string()),
+                      ('issue_code', pa.string()),
+                      ('error_message', pa.string())])
+
+
+def to_arrow(df: pd.DataFrame):
+    """
+    Converts a formatted issue DataFrame to a pyarrow.Table with the issue schema.
+    """
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(df[ISSUE_COLUMNS], schema=issue_schema(), preserve_index=False)
+
+
+class Sink:
+    """
+    Destination for issue DataFrames. Rules hand over their results as soon as
+    they finish, so a sink never sees the full concatenated output.
+    """
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Appends issue rows. Empty frames are ignored.
+        """
+        if df is None or df.empty:
+            return
+
+        self._write(df[ISSUE_COLUMNS])
+
+    def _write(self, df: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CsvSink(Sink):
+    """
+    Streams issues to CSV. Compression is taken from the file suffix (.gz, .bz2, .xz).
+    """
+
+    openers = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+    def __init__(self, path: str, append: bool = False):
+        opener = self.openers.get(os.path.splitext(path)[1], open)
+        self.header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        self.file = opener(path, 'at' if append else 'wt', newline='')
+
+    def _write(self, df: pd.DataFrame) -> None:
+        df.to_csv(self.file, index=False, header=self.header)
+        self.header = False
+
+    def close(self) -> None:
+        if self.header:
+            self.file.write(','.join(ISSUE_COLUMNS) + '\n')
+        self.file.close()
+
+
+class ParquetSink(Sink):
+    """
+    Streams issues to a Parquet file, one row group per write.
+    """
+
+    def __init__(self, path: str, compression: str = 'zstd'):
+        import pyarrow.parquet as pq
+
+        self.writer = pq.ParquetWriter(path, issue_schema(), compression=compression)
+
+    def _write(self, df: pd.DataFrame) -> None:
+        self.writer.write_table(to_arrow(df))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class ArrowSink(Sink):
+    """
+    Streams issues to an Arrow IPC (Feather v2) file, one record batch per write.
+    """
+
+    def __init__(self, path: str, compression: str = 'zstd'):
+        import pyarrow as pa
+
+        self.sink = pa.OSFile(path, 'wb')
+        self.writer = pa.ipc.new_file(self.sink, issue_schema(), options=pa.ipc.IpcWriteOptions(compression=compression))
+
+    def _write(self, df: pd.DataFrame) -> None:
+        self.writer.write_table(to_arrow(df))
+
+    def close(self) -> None:
+        self.writer.close()
+        self.sink.close()
+
+
+class DatabaseSink(Sink):
+    """
+    Inserts issues into the issue repository table in Snowflake over pyodbc. Resolved issues
+    (date_resolved set, as --watch writes them) close the open row with the same key instead.
+        :param table: Fully qualified issue repository table.
+        :param connection_string: ODBC connection string. Defaults to Snowflake_Connection_String.
+        :param con: Open DB-API connection using qmark parameters to use instead, e.g. sqlite3 for tests.
+    """
+
+    key_columns = ['material_number', 'alt_uom', 'issue_code', 'error_message']
+
+    def __init__(self, table: str, connection_string: str | None = None, con=None):
+        if con is None:
+            import pyodbc as odbc
+
+            con = odbc.connect(connection_string or os.environ.get('Snowflake_Connection_String'))
+            self.cursor = con.cursor()
+            self.cursor.fast_executemany = True
+        else:
+            self.cursor = con.cursor()
+
+        self.con = con
+        self.sql = (f'INSERT INTO {table} ({", ".join(ISSUE_COLUMNS)}) '
+                    f'VALUES ({", ".join("?" for _ in ISSUE_COLUMNS)})')
+        # IS NOT DISTINCT FROM, since alt_uom can be blank.
+        self.resolve_sql = (f'UPDATE {table} SET date_resolved = ? '
+                            f'WHERE {" AND ".join(f"{col} IS NOT DISTINCT FROM ?" for col in self.key_columns)} '
+                            f'AND date_resolved IS NULL')
+
+    def _write(self, df: pd.DataFrame) -> None:
+        df = df.astype(object).where(df.notna(), None)
+        resolved = df['date_resolved'].notna()
+
+        if (~resolved).any():
+            self.cursor.executemany(self.sql, list(df[~resolved].itertuples(index=False, name=None)))
+        if resolved.any():
+            rows = df.loc[resolved, ['date_resolved', *self.key_columns]].itertuples(index=False, name=None)
+            self.cursor.executemany(self.resolve_sql, list(rows))
+
+    def close(self) -> None:
+        self.con.commit()
+        self.cursor.close()
+        self.con.close()
+
+
+class TeeSink(Sink):
+    """
+    Hands every issue DataFrame to several sinks, e.g. a detail file and a rollup.
+    """
+
+    def __init__(self, *sinks: Sink):
+        self.sinks = sinks
+
+    def write(self, df: pd.DataFrame) -> None:
+        for sink in self.sinks:
+            sink.write(df)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+class BackgroundSink(Sink):
+    """
+    Wraps a sink so writes happen on a background thread while rules keep evaluating.
+    The queue is bounded so a slow destination pushes back on the producer instead of
+    buffering every result. Errors raised by the worker are re-raised on the next write or close.
+    """
+
+    def __init__(self, sink: Sink, max_pending: int = 4):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._worker, name='issue-sink', daemon=True)
+        self.thread.start()
+
+    def _worker(self) -> None:
+        while True:
+            df = self.queue.get()
+            if df is None:
+                break
+            if self.error is None:
+                try:
+                    self.sink.write(df)
+                except Exception as error:
+                    self.error = error
+
+    def _raise(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+    def write(self, df: pd.DataFrame) -> None:
+        self._raise()
+        if df is None or df.empty:
+            return
+
+        self.queue.put(df)
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+        self.sink.close()
+        self._raise()
+
+
+def open_sink(output: str, table: str | None = None, background: bool = True, append: bool = False) -> Sink:
+    """
+    Returns the sink matching the output file suffix, or a DatabaseSink when a table is given.
+        :param output: Destination path. .parquet, .arrow/.feather or .csv with optional .gz/.bz2/.xz.
+        :param table: Fully qualified issue repository table. Overrides output.
+        :param background: Write on a background thread.
+        :param append: Keep rows already in output. Only CSV files can be appended to, so an
+                       existing .parquet/.arrow output raises ValueError instead of being overwritten.
+        :return: Sink
+    """
+    if append and not table and output.endswith(('.parquet', '.arrow', '.feather')) and os.path.exists(output):
+        raise ValueError(f'Cannot append to {output}. Use a .csv output or move the file away before resuming.')
+
+    if table:
+        sink = DatabaseSink(table)
+    elif output.endswith('.parquet'):
+        sink = ParquetSink(output)
+    elif output.endswith(('.arrow', '.feather')):
+        sink = ArrowSink(output)
+    else:
+        sink = CsvSink(output, append=append)
+
+    return BackgroundSink(sink) if background else sink
@@ -0,0 +1,195 @@
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+SPILL_COLUMNS = ['upc', 'material_number', 'alt_uom']
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(value: str | int) -> int:
+    """
+    Converts a memory budget such as 512MB, 2G or 1048576 to bytes.
+    """
+    if isinstance(value, int):
+        return value
+
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?\s*', value.upper())
+    if not match:
+        raise ValueError(f'Invalid memory size: {value}')
+
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def spill_schema():
+    import pyarrow as pa
+
+    return pa.schema([(col, pa.string()) for col in SPILL_COLUMNS])
+
+
+class SpillPartitioner:
+    """
+    Hash-partitions (upc, material_number, alt_uom) tuples by upc into Arrow IPC files,
+    so every occurrence of a UPC lands in the same bucket.
+        :param directory: Directory for the bucket files.
+        :param partitions: Number of buckets.
+        :param salt: Hash salt. Re-partitioning an oversized bucket uses a new salt.
+        :param prefix: Bucket file name prefix.
+    """
+
+    def __init__(self, directory: str, partitions: int, salt: int = 0, prefix: str = 'upc'):
+        self.directory = directory
+        self.prefix = prefix
+        self.partitions = partitions
+        self.salt = salt
+        self.files = {}
+        self.writers = {}
+        self.sizes = np.zeros(partitions, dtype=np.int64)
+
+    def path(self, bucket: int) -> str:
+        return os.path.join(self.directory, f'{self.prefix}_{bucket:04d}.arrow')
+
+    def add(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+
+        df = df[SPILL_COLUMNS]
+        if df.empty:
+            return
+
+        hashes = pd.util.hash_pandas_object(df['upc'], index=False, hash_key=f'{self.salt:016d}').to_numpy()
+        buckets = (hashes % np.uint64(self.partitions)).astype(np.int64)
+        order = np.argsort(buckets, kind='stable')
+        bounds = np.searchsorted(buckets[order], np.arange(self.partitions + 1))
+
+        for bucket in np.flatnonzero(np.diff(bounds)):
+            part = df.iloc[order[bounds[bucket]:bounds[bucket + 1]]]
+            if bucket not in self.writers:
+                self.files[bucket] = pa.OSFile(self.path(bucket), 'wb')
+                self.writers[bucket] = pa.ipc.new_stream(self.files[bucket], spill_schema())
+            self.writers[bucket].write_table(pa.Table.from_pandas(part, schema=spill_schema(), preserve_index=False))
+            self.sizes[bucket] += frame_bytes(part)
+
+    def close(self) -> None:
+        # Closing the stream writer leaves the OSFile open, so the bucket could not be removed on Windows.
+        for bucket, writer in self.writers.items():
+            writer.close()
+            self.files[bucket].close()
+        self.files, self.writers = {}, {}
+
+    def buckets(self):
+        """
+        Yields (bucket file, in-memory size in bytes) for every non-empty bucket.
+        """
+        for bucket in np.flatnonzero(self.sizes):
+            yield self.path(bucket), int(self.sizes[bucket])
+
+
+def read_bucket(path: str):
+    """
+    Yields a bucket file back as DataFrames, one per written chunk.
+    """
+    import pyarrow as pa
+
+    with pa.OSFile(path, 'rb') as file:
+        for batch in pa.ipc.open_stream(file):
+            yield batch.to_pandas()
+
+
+def catalog_chunks(path: str, chunksize: int = 500_000):
+    """
+    Reads a vendor catalog (.parquet or .csv with upc, material_number and alt_uom) in chunks.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=SPILL_COLUMNS):
+            yield batch.to_pandas().astype('string')
+    else:
+        yield from pd.read_csv(path, usecols=SPILL_COLUMNS, dtype='string', chunksize=chunksize)
+
+
+def bucket_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Finds UPCs used more than once and builds the unique_upc() error message for every use.
+        :return: pd.DataFrame | material_number | alt_uom | error_message |
+    """
+    df = df[df['upc'].notna()]
+    dup_df = df[df.groupby('upc')['upc'].transform('size') > 1]
+
+    keys = dup_df['material_number'].astype(object) + ' - ' + dup_df['alt_uom'].astype(object)
+    messages = {upc: f'Duplicate UPC {str({upc: key_list})}' for upc, key_list in keys.groupby(dup_df['upc']).agg(list).items()}
+
+    return pd.DataFrame({'material_number': dup_df['material_number'].to_numpy(),
+                         'alt_uom': dup_df['alt_uom'].to_numpy(),
+                         'error_message': dup_df['upc'].map(messages).to_numpy()})
+
+
+def duplicate_upcs(chunks, memory_budget: int | str, directory: str | None = None, fanout: int = 64,
+                   max_depth: int = 3) -> pd.DataFrame:
+    """
+    Cross-material duplicate UPC detection with bounded memory. Chunks are buffered
+    until they exceed the memory budget, then everything is hash-partitioned by UPC
+    into on-disk buckets which are processed one at a time. A bucket that is still
+    larger than the budget is re-partitioned with a different hash salt.
+        :param chunks: Iterable of DataFrames with upc, material_number and alt_uom, e.g. the MEAN
+                       table from Source.read_chunks(queries.mean_upc) plus vendor catalogs.
+        :param memory_budget: Bytes (or a size such as '512MB') of tuples held in memory at once.
+        :param directory: Where buckets are written. Defaults to a temporary directory.
+        :param fanout: Buckets per partitioning pass.
+        :param max_depth: Most partitioning passes for a single bucket.
+        :return: pd.DataFrame | material_number | alt_uom | error_message | for unique_upc(duplicate_upc_df=...)
+    """
+    memory_budget = parse_size(memory_budget)
+    buffered, buffered_bytes, partitioner = [], 0, None
+    spill_dir = tempfile.mkdtemp(prefix='upc_spill_', dir=directory)
+
+    try:
+        for chunk in chunks:
+            chunk = chunk[SPILL_COLUMNS]
+            if partitioner is not None:
+                partitioner.add(chunk)
+                continue
+
+            buffered.append(chunk)
+            buffered_bytes += frame_bytes(chunk)
+            if buffered_bytes > memory_budget:
+                partitioner = SpillPartitioner(spill_dir, fanout)
+                for buffered_chunk in buffered:
+                    partitioner.add(buffered_chunk)
+                buffered = []
+
+        if partitioner is None:
+            return bucket_duplicates(pd.concat(buffered) if buffered else pd.DataFrame(columns=SPILL_COLUMNS))
+
+        partitioner.close()
+
+        def process(path: str, size: int, depth: int) -> list:
+            if size <= memory_budget or depth >= max_depth:
+                return [bucket_duplicates(pd.concat(read_bucket(path)))]
+
+            sub_partitioner = SpillPartitioner(spill_dir, fanout, salt=depth,
+                                               prefix=os.path.splitext(os.path.basename(path))[0])
+            for bucket_chunk in read_bucket(path):
+                sub_partitioner.add(bucket_chunk)
+            sub_partitioner.close()
+            os.remove(path)
+
+            return [result for sub_path, sub_size in sub_partitioner.buckets()
+                    for result in process(sub_path, sub_size, depth + 1)]
+
+        results = [result for path, size in partitioner.buckets() for result in process(path, size, 1)]
+
+        return pd.concat(results, ignore_index=True)
+    finally:
+        if partitioner is not None:
+            partitioner.close()
+        shutil.rmtree(spill_dir, ignore_errors=True)
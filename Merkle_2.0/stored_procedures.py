@@ -1,8 +1,6 @@
 from datetime import date
-import os
 
 import pandas as pd
-import pyodbc as odbc
 
 from exempt_pcat import exempt_pcat
 from queries import duplicate_upc
@@ -172,33 +170,23 @@ def is_alt_uom_weight_zero(df: pd.DataFrame,
     return format_df(alt_uom_df, issue_category=issue_category, issue_code=issue_code, error_message=error_message)
 
 
-def missing_alternate_uom(df: pd.DataFrame,
-                          issue_category: str = 'SUPPLY_CHAIN',
-                          issue_code: str = 'MISSING_AUOM',
-                          error_message: str = 'Every SKU needs an alternative unit of measure that is not a 1:1 equivalent.') -> pd.DataFrame:
+def one_to_one_materials(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Every SKU needs an alternative unit of measure that is not a
-    1:1 equivalent. Three exceptions disqualify certain SKUs from this rule:
-    1. Base unit weight 26 lbs or greater
-    2. Base unit is already a case.
-    3. SKU belongs in a manually exempt product category.
+    Rows of the SKUs missing_alternate_uom() flags before its weight exemption: every unit
+    at least as large as the base unit is 1:1, the base unit is not a case and the product
+    category is not exempt. Shared with sweep.weight_exemption_sweep().
         :param df: Target DataFrame contain SKU/UOM data for evaluation.
-        :param issue_category: Owner of the issue's resolution.
-        :param issue_code: Short form code identifying the issue type.
-        :param error_message: Output detailing why the SKU/UOM was flagged.
-        :return: pd.DataFrame | material_number | alt_uom | date_discovered | date_resolved | issue_category | error_message |
+        :return: pd.DataFrame | material_data columns | b_gross_weight |
     """
-
     base_df = df[df['base_uom'] == df['alt_uom']][['material_number', 'gross_weight']].rename(columns={'gross_weight': 'b_gross_weight'})
 
     df = df.merge(base_df, on='material_number', how='inner')
     df = df[df['conversion_numerator'] >= df['conversion_denominator']] # Removes AUOMs that are smaller than base UOM
 
-    weight_exception = df['b_gross_weight'] >= 26
     base_case_exception = df['base_uom'] == 'CS'
     pcat_exception = df['product_category'].isin(exempt_pcat)
 
-    blacklist = df[weight_exception | base_case_exception | pcat_exception]
+    blacklist = df[base_case_exception | pcat_exception]
     blacklist = blacklist['material_number'].drop_duplicates()
 
     whitelist = df[['material_number', 'conversion_numerator', 'conversion_denominator']]
@@ -206,9 +194,34 @@ def missing_alternate_uom(df: pd.DataFrame,
     whitelist = whitelist[whitelist['conversion_numerator'] == whitelist['conversion_denominator']]
     whitelist = whitelist[~whitelist['material_number'].isin(blacklist)]['material_number']
 
+    return df[df['material_number'].isin(whitelist)]
+
+
+def missing_alternate_uom(df: pd.DataFrame,
+                          issue_category: str = 'SUPPLY_CHAIN',
+                          issue_code: str = 'MISSING_AUOM',
+                          error_message: str = 'Every SKU needs an alternative unit of measure that is not a 1:1 equivalent.',
+                          weight_exemption: float = 26) -> pd.DataFrame:
+    """
+    Every SKU needs an alternative unit of measure that is not a
+    1:1 equivalent. Three exceptions disqualify certain SKUs from this rule:
+    1. Base unit weight 26 lbs or greater
+    2. Base unit is already a case.
+    3. SKU belongs in a manually exempt product category.
+        :param df: Target DataFrame contain SKU/UOM data for evaluation.
+        :param issue_category: Owner of the issue's resolution.
+        :param issue_code: Short form code identifying the issue type.
+        :param error_message: Output detailing why the SKU/UOM was flagged.
+        :param weight_exemption: Base unit gross weight at or above which a SKU is exempt.
+        :return: pd.DataFrame | material_number | alt_uom | date_discovered | date_resolved | issue_category | error_message |
+    """
+    df = one_to_one_materials(df)
+
+    blacklist = df[df['b_gross_weight'] >= weight_exemption]['material_number'].drop_duplicates()
+
     no_alt_uom_df = df[df['base_uom'] == df['alt_uom']].drop(columns=['b_gross_weight'])
 
-    no_alt_uom_df = no_alt_uom_df[no_alt_uom_df['material_number'].isin(whitelist)]
+    no_alt_uom_df = no_alt_uom_df[~no_alt_uom_df['material_number'].isin(blacklist)]
 
     return format_df(no_alt_uom_df, issue_category=issue_category, issue_code=issue_code, error_message=error_message)
 
@@ -342,20 +355,14 @@ def redundant_conversion(df: pd.DataFrame,
     return format_df(df_alt_uom, issue_category=issue_category, issue_code=issue_code, error_message=error_message)
 
 
-def pallet_case_fault_tolerance(df: pd.DataFrame,
-                                issue_category: str = 'SUPPLY_CHAIN',
-                                issue_code: str = 'PALLET_VOLUME',
-                                error_message: str = 'Volume of PAL level should not be Greater than 120% of Expected/Calculated Volume') -> pd.DataFrame:
+def pallet_volume_diff(df: pd.DataFrame) -> pd.DataFrame:
     """
-    If both CS and PAL levels exist, Volume of PAL level should not be Greater than 120% of
-    Expected/Calculated Volume (Volume of CS level multiplied by Number of Cases on a Pallet)
+    PAL rows of SKUs with exactly one CS and one PAL level, with the PAL volume's relative
+    difference from the calculated volume (CS volume times cases per pallet).
+    Shared by pallet_case_fault_tolerance() and sweep.pallet_volume_sweep().
         :param df: Target DataFrame contain SKU/UOM data for evaluation.
-        :param issue_category: Owner of the issue's resolution.
-        :param issue_code: Short form code identifying the issue type.
-        :param error_message: Output detailing why the SKU/UOM was flagged.
-        :return: pd.DataFrame | material_number | alt_uom | date_discovered | date_resolved | issue_category | error_message |
+        :return: pd.DataFrame | material_data columns | case_volume | case_num | number_of_cases | calculated_volume | volume_diff |
     """
-
     df = df[(df['alt_uom'] == 'CS') | (df['alt_uom'] == 'PAL')]
 
     df_count = df.value_counts(subset=['material_number']).reset_index()
@@ -375,11 +382,31 @@ def pallet_case_fault_tolerance(df: pd.DataFrame,
     pallet_df['calculated_volume'] = pallet_df['number_of_cases'] * pallet_df['case_volume']
     pallet_df['volume_diff'] = (pallet_df['volume'] - pallet_df['calculated_volume']) / pallet_df['calculated_volume']
 
-    pallet_df = pallet_df[pallet_df['volume_diff'] > 1.2].drop(columns=['case_volume',
-                                                                        'case_num',
-                                                                        'number_of_cases',
-                                                                        'calculated_volume',
-                                                                        'volume_diff'])
+    return pallet_df
+
+
+def pallet_case_fault_tolerance(df: pd.DataFrame,
+                                issue_category: str = 'SUPPLY_CHAIN',
+                                issue_code: str = 'PALLET_VOLUME',
+                                error_message: str = 'Volume of PAL level should not be Greater than 120% of Expected/Calculated Volume',
+                                tolerance: float = 1.2) -> pd.DataFrame:
+    """
+    If both CS and PAL levels exist, Volume of PAL level should not be Greater than 120% of
+    Expected/Calculated Volume (Volume of CS level multiplied by Number of Cases on a Pallet)
+        :param df: Target DataFrame contain SKU/UOM data for evaluation.
+        :param issue_category: Owner of the issue's resolution.
+        :param issue_code: Short form code identifying the issue type.
+        :param error_message: Output detailing why the SKU/UOM was flagged.
+        :param tolerance: How much greater the PAL volume is allowed to be, relative to the calculated volume.
+        :return: pd.DataFrame | material_number | alt_uom | date_discovered | date_resolved | issue_category | error_message |
+    """
+    pallet_df = pallet_volume_diff(df)
+
+    pallet_df = pallet_df[pallet_df['volume_diff'] > tolerance].drop(columns=['case_volume',
+                                                                              'case_num',
+                                                                              'number_of_cases',
+                                                                              'calculated_volume',
+                                                                              'volume_diff'])
 
     return format_df(pallet_df, issue_category=issue_category, issue_code=issue_code, error_message=error_message)
 
@@ -407,6 +434,24 @@ def smaller_gross_weight_failure(df: pd.DataFrame,
     return format_df(alt_uom_df, issue_category=issue_category, issue_code=issue_code, error_message=error_message)
 
 
+def weight_percent_diff(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    AUOM rows with a Numerator > 1 and the gross weight's relative difference from the calculated
+    weight (base unit weight times the Numerator).
+    Shared by larger_gross_weight_failure() and sweep.weight_tolerance_sweep().
+        :param df: Target DataFrame contain SKU/UOM data for evaluation.
+        :return: pd.DataFrame | material_data columns | b_gross_weight | calculated_weight | percent_diff |
+    """
+    base_uom_df = df[df['base_uom'] == df['alt_uom']][['material_number', 'gross_weight']].rename(columns={'gross_weight': 'b_gross_weight'})
+
+    alt_uom_df = df[(df['base_uom'] != df['alt_uom']) & (df['conversion_numerator'] > 1)]
+    alt_uom_df = alt_uom_df.merge(base_uom_df, on='material_number', how='inner')
+    alt_uom_df['calculated_weight'] = alt_uom_df['b_gross_weight'] * alt_uom_df['conversion_numerator']
+    alt_uom_df['percent_diff'] = (alt_uom_df['gross_weight'] - alt_uom_df['calculated_weight']) / alt_uom_df['calculated_weight']
+
+    return alt_uom_df
+
+
 def larger_gross_weight_failure(df: pd.DataFrame,
                                 issue_category: str = 'SUPPLY_CHAIN',
                                 issue_code: str = 'WEIGHT_TOLERANCE',
@@ -425,12 +470,7 @@ def larger_gross_weight_failure(df: pd.DataFrame,
         :param lower_tolerance: How much smaller the gross_weight is allowed to be in comparison to the calculated weight.
         :return: pd.DataFrame | material_number | alt_uom | date_discovered | date_resolved | issue_category | error_message |
     """
-    base_uom_df = df[df['base_uom'] == df['alt_uom']][['material_number', 'gross_weight']].rename(columns={'gross_weight': 'b_gross_weight'})
-
-    alt_uom_df = df[(df['base_uom'] != df['alt_uom']) & (df['conversion_numerator'] > 1)]
-    alt_uom_df = alt_uom_df.merge(base_uom_df, on='material_number', how='inner')
-    alt_uom_df['calculated_weight'] = alt_uom_df['b_gross_weight'] * alt_uom_df['conversion_numerator']
-    alt_uom_df['percent_diff'] = (alt_uom_df['gross_weight'] - alt_uom_df['calculated_weight']) / alt_uom_df['calculated_weight']
+    alt_uom_df = weight_percent_diff(df)
 
     alt_uom_df = alt_uom_df[(alt_uom_df['percent_diff'] > upper_tolerance) | (alt_uom_df['percent_diff'] < lower_tolerance)]
     alt_uom_df = alt_uom_df.drop(columns=['b_gross_weight', 'calculated_weight', 'percent_diff'])
@@ -479,29 +519,34 @@ def upc_required(df: pd.DataFrame,
 
 def unique_upc(df: pd.DataFrame,
                issue_category: str = 'SUPPLY_CHAIN',
-               issue_code: str = 'DUPLICATE_UPC') -> None:
+               issue_code: str = 'DUPLICATE_UPC',
+               duplicate_upc_df: pd.DataFrame | None = None) -> None:
     """
     UPC/GTIN values must be Valid and must be unique for each AUOM entry within the record and across all other records
         :param df: Target DataFrame contain SKU/UOM data for evaluation.
         :param issue_category: Owner of the issue's resolution.
         :param issue_code: Short form code identifying the issue type.
+        :param duplicate_upc_df: Precomputed duplicates | material_number | alt_uom | error_message |, e.g. from
+                                 spill.duplicate_upcs(). Skips the duplicate_upc query when given.
         :return: pd.DataFrame | material_number | alt_uom | date_discovered | date_resolved | issue_category | error_message |
     """
+    if duplicate_upc_df is None:
+        from extract import open_source
 
-    with odbc.connect(os.environ.get('Snowflake_Connection_String')) as con:
-        duplicate_upc_df = pd.read_sql_query(sql=duplicate_upc, con=con, dtype='string')
+        with open_source() as source:
+            duplicate_upc_df = source.read(duplicate_upc, dtype='string')
 
-    duplicate_upc_df = duplicate_upc_df.groupby('upc').agg(upc_collapse).reset_index()
-    duplicate_upc_df['key'] = duplicate_upc_df['error_message']
-    duplicate_upc_df = duplicate_upc_df.explode('key').reset_index(drop=True)
-    duplicate_upc_df[['material_number', 'alt_uom']] = duplicate_upc_df['key'].str.split(' - ', expand=True)
+        duplicate_upc_df = duplicate_upc_df.groupby('upc').agg(upc_collapse).reset_index()
+        duplicate_upc_df['key'] = duplicate_upc_df['error_message']
+        duplicate_upc_df = duplicate_upc_df.explode('key').reset_index(drop=True)
+        duplicate_upc_df[['material_number', 'alt_uom']] = duplicate_upc_df['key'].str.split(' - ', expand=True)
 
-    for i in range(len(duplicate_upc_df)):
-        error_list = duplicate_upc_df.loc[i, 'error_message']
-        upc_key = duplicate_upc_df.loc[i, 'upc']
-        error_dict = str({upc_key: error_list})
+        for i in range(len(duplicate_upc_df)):
+            error_list = duplicate_upc_df.loc[i, 'error_message']
+            upc_key = duplicate_upc_df.loc[i, 'upc']
+            error_dict = str({upc_key: error_list})
 
-        duplicate_upc_df.loc[i, 'error_message'] = f'Duplicate UPC {error_dict}'
+            duplicate_upc_df.loc[i, 'error_message'] = f'Duplicate UPC {error_dict}'
 
     df = df.merge(duplicate_upc_df, on=['material_number', 'alt_uom'], how='inner')
 
@@ -0,0 +1,140 @@
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from stored_procedures import one_to_one_materials, pallet_volume_diff, weight_percent_diff
+
+
+def weight_ratios(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    percent_diff of every row larger_gross_weight_failure() evaluates.
+        :return: pd.DataFrame | material_number | alt_uom | ratio |
+    """
+    return weight_percent_diff(df)[['material_number', 'alt_uom', 'percent_diff']].rename(columns={'percent_diff': 'ratio'})
+
+
+def pallet_ratios(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    volume_diff of every PAL row pallet_case_fault_tolerance() evaluates.
+        :return: pd.DataFrame | material_number | alt_uom | ratio |
+    """
+    return pallet_volume_diff(df)[['material_number', 'alt_uom', 'volume_diff']].rename(columns={'volume_diff': 'ratio'})
+
+
+def base_weights(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Materials missing_alternate_uom() flags when the weight exemption is ignored, with the
+    heaviest base unit weight that could exempt them and the number of issue rows each produces.
+        :return: pd.DataFrame | material_number | ratio | rows |
+    """
+    df = one_to_one_materials(df)
+
+    # NaN weights never reach the exemption, so they sort below every threshold.
+    weight_df = df.groupby('material_number').agg(ratio=('b_gross_weight', 'max'))
+    weight_df['ratio'] = weight_df['ratio'].fillna(-np.inf)
+    weight_df['rows'] = df[df['base_uom'] == df['alt_uom']].groupby('material_number').size()
+
+    return weight_df.dropna(subset=['rows']).reset_index()
+
+
+class SortedRatios:
+    """
+    Sorted ratio column with prefix counts, answering "how many rows are above/below x"
+    for a whole array of thresholds with one searchsorted call.
+    NaN ratios fail every comparison, so they are dropped up front.
+    """
+
+    def __init__(self, ratio_df: pd.DataFrame, weights: str | None = None):
+        ratio_df = ratio_df[ratio_df['ratio'].notna()].sort_values('ratio', kind='stable')
+        self.ratios = ratio_df['ratio'].to_numpy(dtype=float)
+        self.materials = ratio_df['material_number'].to_numpy()
+        row_weights = np.ones(len(ratio_df)) if weights is None else ratio_df[weights].to_numpy(dtype=float)
+        self.cumulative = np.concatenate([[0], np.cumsum(row_weights)])
+
+    def count_below(self, thresholds) -> np.ndarray:
+        return self.cumulative[np.searchsorted(self.ratios, thresholds, side='left')]
+
+    def count_at_or_below(self, thresholds) -> np.ndarray:
+        return self.cumulative[np.searchsorted(self.ratios, thresholds, side='right')]
+
+    def count_above(self, thresholds) -> np.ndarray:
+        return self.cumulative[-1] - self.count_at_or_below(thresholds)
+
+    def materials_between(self, start: int, stop: int) -> list:
+        return sorted(set(self.materials[start:stop]))
+
+
+def _sweep_frame(columns: dict, counts: np.ndarray, materials: list | None) -> pd.DataFrame:
+    sweep_df = pd.DataFrame(columns)
+    sweep_df['issue_count'] = counts.astype('int64')
+    if materials is not None:
+        sweep_df['materials'] = materials
+
+    return sweep_df
+
+
+def weight_tolerance_sweep(df: pd.DataFrame, upper_tolerances: list, lower_tolerances: list,
+                           skus: bool = False) -> pd.DataFrame:
+    """
+    WEIGHT_TOLERANCE counts of larger_gross_weight_failure() for every
+    (upper_tolerance, lower_tolerance) pair, from a single pass over the weight ratios.
+        :param df: Target DataFrame contain SKU/UOM data for evaluation.
+        :param upper_tolerances: Candidate upper_tolerance values, e.g. [0.25, 0.30].
+        :param lower_tolerances: Candidate lower_tolerance values, e.g. [-0.05, -0.10].
+        :param skus: Also return the affected material numbers per combination.
+        :return: pd.DataFrame | upper_tolerance | lower_tolerance | issue_count | [materials] |
+    """
+    sorted_ratios = SortedRatios(weight_ratios(df))
+    upper, lower = (np.asarray(values, dtype=float) for values in zip(*product(upper_tolerances, lower_tolerances)))
+
+    # Rows above upper plus rows below lower, minus rows counted twice when lower > upper.
+    counts = (sorted_ratios.count_above(upper) + sorted_ratios.count_below(lower)
+              - np.maximum(0, sorted_ratios.count_below(lower) - sorted_ratios.count_at_or_below(upper)))
+
+    materials = None
+    if skus:
+        high = np.searchsorted(sorted_ratios.ratios, upper, side='right')
+        low = np.searchsorted(sorted_ratios.ratios, lower, side='left')
+        materials = [sorted(set(sorted_ratios.materials[h:]) | set(sorted_ratios.materials[:l]))
+                     for h, l in zip(high, low)]
+
+    return _sweep_frame({'upper_tolerance': upper, 'lower_tolerance': lower}, counts, materials)
+
+
+def pallet_volume_sweep(df: pd.DataFrame, tolerances: list, skus: bool = False) -> pd.DataFrame:
+    """
+    PALLET_VOLUME counts of pallet_case_fault_tolerance() for every tolerance.
+        :param df: Target DataFrame contain SKU/UOM data for evaluation.
+        :param tolerances: Candidate tolerance values, e.g. [1.2, 1.3, 1.5].
+        :param skus: Also return the affected material numbers per tolerance.
+        :return: pd.DataFrame | tolerance | issue_count | [materials] |
+    """
+    sorted_ratios = SortedRatios(pallet_ratios(df))
+    tolerances = np.asarray(tolerances, dtype=float)
+
+    materials = None
+    if skus:
+        materials = [sorted_ratios.materials_between(start, None)
+                     for start in np.searchsorted(sorted_ratios.ratios, tolerances, side='right')]
+
+    return _sweep_frame({'tolerance': tolerances}, sorted_ratios.count_above(tolerances), materials)
+
+
+def weight_exemption_sweep(df: pd.DataFrame, thresholds: list, skus: bool = False) -> pd.DataFrame:
+    """
+    MISSING_AUOM counts of missing_alternate_uom() for every base unit weight exemption.
+        :param df: Target DataFrame contain SKU/UOM data for evaluation.
+        :param thresholds: Candidate weight_exemption values in lbs, e.g. [20, 26, 30].
+        :param skus: Also return the affected material numbers per threshold.
+        :return: pd.DataFrame | weight_exemption | issue_count | [materials] |
+    """
+    sorted_ratios = SortedRatios(base_weights(df), weights='rows')
+    thresholds = np.asarray(thresholds, dtype=float)
+
+    materials = None
+    if skus:
+        materials = [sorted_ratios.materials_between(0, stop)
+                     for stop in np.searchsorted(sorted_ratios.ratios, thresholds, side='left')]
+
+    return _sweep_frame({'weight_exemption': thresholds}, sorted_ratios.count_below(thresholds), materials)
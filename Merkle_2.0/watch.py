@@ -0,0 +1,284 @@
+import os
+import queue
+import threading
+import time
+from datetime import date
+
+import pandas as pd
+
+from sinks import ISSUE_COLUMNS, to_arrow
+
+
+ISSUE_KEY = ['material_number', 'alt_uom', 'issue_code', 'error_message']
+
+
+class ChangeLogFeed:
+    """
+    Reads changed material numbers from a change log table with columns
+    change_id (increasing) and material_number.
+    When streams are given (Snowflake streams on MARM/MEAN) their pending rows are
+    first moved into the change log, which advances the stream offsets.
+    Any DB-API connection using qmark parameters works, e.g. pyodbc or sqlite3 for tests.
+        :param con: Open database connection.
+        :param table: Change log table.
+        :param streams: Snowflake streams to drain into the change log on every poll.
+        :param offset: Last change_id already processed.
+    """
+
+    def __init__(self, con, table: str, streams: list | None = None, offset: int = 0):
+        self.con = con
+        self.table = table
+        self.streams = streams or []
+        self.offset = offset
+
+    def poll(self, limit: int | None = None) -> tuple:
+        """
+        Returns (material numbers changed since the last poll, highest change_id seen).
+            :param limit: Most changes to read. The offset only advances over the changes read,
+                          so the rest of a backlog is picked up by later polls.
+        """
+        cursor = self.con.cursor()
+
+        for stream in self.streams:
+            cursor.execute(f'INSERT INTO {self.table} (material_number) SELECT DISTINCT LTRIM(matnr, 0) FROM {stream}')
+        if self.streams:
+            self.con.commit()
+
+        sql = f'SELECT change_id, material_number FROM {self.table} WHERE change_id > ? ORDER BY change_id'
+        params = [self.offset]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+
+        if rows:
+            self.offset = rows[-1][0]
+
+        return [row[1] for row in rows], self.offset
+
+
+class MicroBatcher:
+    """
+    Coalesces changed material numbers into de-duplicated batches. A batch is ready
+    once it holds max_size materials or its oldest change has waited max_wait seconds.
+    """
+
+    def __init__(self, max_size: int = 1000, max_wait: float = 60.0):
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.materials = {}
+        self.offset = None
+        self.opened = None
+
+    def add(self, materials: list, offset: int) -> None:
+        if materials and self.opened is None:
+            self.opened = time.monotonic()
+        self.materials.update(dict.fromkeys(materials))
+        self.offset = offset
+
+    def full(self) -> bool:
+        return len(self.materials) >= self.max_size
+
+    def room(self) -> int:
+        return max(self.max_size - len(self.materials), 0)
+
+    def ready(self) -> bool:
+        if not self.materials:
+            return False
+
+        return self.full() or time.monotonic() - self.opened >= self.max_wait
+
+    def take(self) -> tuple:
+        """
+        Returns (material numbers, change_id the batch covers) and starts a new batch.
+        """
+        materials, offset = list(self.materials), self.offset
+        self.materials, self.opened = {}, None
+
+        return materials, offset
+
+
+def issue_deltas(open_issues: pd.DataFrame, materials: list, issue_df: pd.DataFrame) -> tuple:
+    """
+    Compares freshly validated issues for a batch of materials with the issues currently open for them.
+        :param open_issues: Open issues from earlier batches.
+        :param materials: Materials validated in this batch.
+        :param issue_df: Issues found for those materials.
+        :return: (updated open issues, delta rows) where resolved issues carry today's date_resolved.
+    """
+    in_batch = open_issues['material_number'].isin(materials)
+    batch_open = open_issues[in_batch]
+    current = issue_df.reindex(columns=ISSUE_COLUMNS).drop_duplicates(subset=ISSUE_KEY)
+
+    open_keys = pd.MultiIndex.from_frame(batch_open[ISSUE_KEY])
+    current_keys = pd.MultiIndex.from_frame(current[ISSUE_KEY])
+
+    new = current[~current_keys.isin(open_keys)]
+    still_open = batch_open[open_keys.isin(current_keys)]
+    resolved = batch_open[~open_keys.isin(current_keys)].assign(date_resolved=date.today())
+
+    open_list = [df for df in (open_issues[~in_batch], still_open, new) if not df.empty]
+    open_issues = pd.concat(open_list, ignore_index=True) if open_list else open_issues.iloc[0:0]
+    delta_list = [df for df in (new, resolved) if not df.empty]
+    delta_df = pd.concat(delta_list, ignore_index=True) if delta_list else current.iloc[0:0]
+
+    return open_issues, delta_df
+
+
+def load_issues(path: str) -> pd.DataFrame:
+    """
+    Reads the issues still open in an issue file written by a sink, e.g. the last full run's output.
+        :param path: .parquet or .csv[.gz|.bz2|.xz] issue file.
+        :return: pd.DataFrame with ISSUE_COLUMNS and no resolved rows.
+    """
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        df = pq.read_table(path).to_pandas()
+    else:
+        df = pd.read_csv(path, dtype='string')
+        for col in ('date_discovered', 'date_resolved'):
+            df[col] = pd.to_datetime(df[col]).dt.date.astype(object).where(df[col].notna(), None)
+
+    df = df.reindex(columns=ISSUE_COLUMNS)
+
+    return df[df['date_resolved'].isna()].reset_index(drop=True)
+
+
+class Watcher:
+    """
+    Polls a change feed, validates changed materials in micro-batches on a worker
+    thread and writes issue deltas to a sink.
+    Backpressure: at most max_pending batches wait for validation. While the queue is
+    full the poller keeps coalescing into the open batch, and once that batch is full
+    it stops polling so further changes wait in the feed.
+        :param feed: ChangeLogFeed or any object with poll(limit) -> (materials, offset) reading at most limit changes.
+        :param validate: Function taking a list of material numbers and returning their issues.
+        :param sink: sinks.Sink receiving new and resolved issues.
+        :param interval: Seconds between polls.
+        :param max_batch: Most materials validated at once.
+        :param max_wait: Most seconds a change waits before its batch is validated.
+        :param max_pending: Most batches queued for validation.
+        :param offset_path: File recording the last change_id whose batch was written, to resume after restarts.
+                            The open issues are saved beside it (state_path()) after every batch.
+        :param open_issues: Issues open before the first batch, e.g. load_issues() on the last full run's output.
+                            Replaces the saved open issues. Without either, every issue starts out as new.
+    """
+
+    def __init__(self, feed, validate, sink, interval: float = 60.0, max_batch: int = 1000,
+                 max_wait: float | None = None, max_pending: int = 2, offset_path: str | None = None,
+                 open_issues: pd.DataFrame | None = None):
+        self.feed = feed
+        self.validate = validate
+        self.sink = sink
+        self.interval = interval
+        self.batcher = MicroBatcher(max_batch, interval if max_wait is None else max_wait)
+        self.batches = queue.Queue(maxsize=max_pending)
+        self.offset_path = offset_path
+        self.state_path = self.state_path_for(offset_path)
+        if open_issues is None:
+            open_issues = self.load_state(self.state_path)
+        self.open_issues = open_issues.reindex(columns=ISSUE_COLUMNS).reset_index(drop=True)
+        self.stop_event = threading.Event()
+        self.error = None
+
+    @staticmethod
+    def load_offset(offset_path: str | None) -> int:
+        if offset_path and os.path.exists(offset_path):
+            with open(offset_path) as file:
+                return int(file.read().strip() or 0)
+
+        return 0
+
+    @staticmethod
+    def state_path_for(offset_path: str | None) -> str | None:
+        """
+        Open issue file kept beside the offset file: watch_offset.txt -> watch_offset_open_issues.parquet.
+        """
+        return f'{os.path.splitext(offset_path)[0]}_open_issues.parquet' if offset_path else None
+
+    @staticmethod
+    def load_state(state_path: str | None) -> pd.DataFrame:
+        if state_path and os.path.exists(state_path):
+            return load_issues(state_path)
+
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+
+    def save_state(self) -> None:
+        """
+        Replaces the open issue file in one step, so a crash leaves the previous batch's state.
+        """
+        import pyarrow.parquet as pq
+
+        temp_path = f'{self.state_path}.tmp'
+        pq.write_table(to_arrow(self.open_issues), temp_path)
+        os.replace(temp_path, self.state_path)
+
+    def process(self, materials: list, offset: int) -> pd.DataFrame:
+        """
+        Validates one batch, writes its deltas and records the open issues and the offset.
+        The offset is written last: a batch replayed after a crash finds its issues already open.
+        """
+        start = time.perf_counter()
+        self.open_issues, delta_df = issue_deltas(self.open_issues, materials, self.validate(materials))
+        self.sink.write(delta_df)
+
+        if self.state_path:
+            self.save_state()
+        if self.offset_path:
+            with open(self.offset_path, 'w') as file:
+                file.write(str(offset))
+
+        print(f'Validated {len(materials)} materials in {time.perf_counter() - start:.1f}s: '
+              f'{delta_df["date_resolved"].isna().sum()} new, {delta_df["date_resolved"].notna().sum()} resolved')
+
+        return delta_df
+
+    def _worker(self) -> None:
+        while True:
+            batch = self.batches.get()
+            if batch is None:
+                break
+            if self.error is not None:
+                continue  # keep draining so the poller never blocks on a dead worker
+            try:
+                self.process(*batch)
+            except Exception as error:
+                self.error = error
+                self.stop_event.set()
+
+    def _offer(self) -> None:
+        # Only the poller thread puts batches, so a free slot cannot be taken before put_nowait().
+        if self.batcher.ready() and not self.batches.full():
+            self.batches.put_nowait(self.batcher.take())
+
+    def run(self, max_polls: int | None = None) -> None:
+        """
+        Runs until stop() is called, max_polls polls have been made or validation fails.
+        Remaining changes are validated before returning.
+        """
+        worker = threading.Thread(target=self._worker, name='validation-worker', daemon=True)
+        worker.start()
+        polls = 0
+
+        try:
+            while not self.stop_event.is_set() and (max_polls is None or polls < max_polls):
+                if not self.batcher.full():
+                    self.batcher.add(*self.feed.poll(self.batcher.room()))
+                    polls += 1
+                self._offer()
+                self.stop_event.wait(self.interval)
+        finally:
+            if self.error is None and self.batcher.materials:
+                self.batches.put(self.batcher.take())
+            self.batches.put(None)
+            worker.join()
+
+        if self.error is not None:
+            raise self.error
+
+    def stop(self) -> None:
+        self.stop_event.set()
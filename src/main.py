@@ -1,12 +1,177 @@
 # -*- coding: UTF-8 -*-
 # Author: Neal Raines
 # Date: 6/10/2025
-# Description: Placeholder file
+# Description: Nightly pipeline. Runs the Monday pull, the Merkle CSV intake and the
+#              Merkle_2.0 validation as cached, concurrent stages, then fans the issues out
+#              into per-vendor and per-category reports.
 
-def main():
-    print("pipeline goes here")
+import argparse
+import glob
+import os
+import shlex
+import subprocess
+import sys
+from datetime import date
+
+from pipeline import Pipeline, Stage
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MERKLE_DIR = os.path.join(ROOT, 'Merkle_2.0')
+
+
+def monday_pull(inputs: dict, outputs: dict, run_date: str, load: bool = False) -> None:
+    """ Pulls the Monday.com certification tracker and optionally loads it into Snowflake
+
+    Args:
+        outputs (dict): 'vendors' parquet file receiving the board items
+        run_date (str): Day of the pull. Only part of the cache key, so the board is pulled once a day
+        load (bool): Also write the items to MONDAY_SC_CERTIFICATION_TRACKER. The load prompts for a
+            Snowflake username and signs in through the browser, so only interactive runs should set it
+    """
+    import monday_snowflake_pull_jon as monday
+
+    df = monday.pull()
+    df.to_parquet(outputs['vendors'], index=False)
+
+    if load:
+        monday.write_to_snowflake(df)
+
+
+def merkle_intake(inputs: dict, outputs: dict) -> None:
+    """ Reads a Merkle output CSV into parquet with every column as string
+
+    Args:
+        inputs (dict): 'merkle_csv' Merkle output file
+        outputs (dict): 'merkle' parquet file
+    """
+    import pandas as pd
+
+    df = pd.read_csv(inputs['merkle_csv'], dtype='string', encoding='utf-8-sig')
+    # The export ends every line with a comma, which reads as an unnamed empty column.
+    df = df.loc[:, ~df.columns.str.startswith('Unnamed:')]
+    df.to_parquet(outputs['merkle'], index=False)
+
+
+def validation(inputs: dict, outputs: dict, run_date: str, options: list | None = None) -> None:
+    """ Runs the Merkle_2.0 validation
+
+    Args:
+        outputs (dict): 'issues' file written by Merkle_2.0/main.py --output
+        run_date (str): Day of the run. Only part of the cache key, so Snowflake is validated once a day
+        options (list): Extra Merkle_2.0/main.py arguments, e.g. ['--category', 'SUPPLY_CHAIN']
+    """
+    command = [sys.executable, os.path.join(MERKLE_DIR, 'main.py'), '--output', os.path.abspath(outputs['issues'])]
+    subprocess.run(command + list(options or []), cwd=MERKLE_DIR, check=True)
+
+
+def vendor_reports(inputs: dict, outputs: dict, file_format: str = 'csv') -> None:
+    """ Writes per-vendor and per-category issue reports next to the manifest
+
+    Args:
+        inputs (dict): 'issues', 'merkle' and 'vendors' parquet files
+        outputs (dict): 'manifest' CSV listing every report with its issue and material counts
+        file_format (str): report file format, 'csv' or 'parquet'
+    """
+    import shutil
+
+    import pandas as pd
+    from reports import fan_out, vendor_issues
+
+    df = vendor_issues(pd.read_parquet(inputs['issues']),
+                       pd.read_parquet(inputs['merkle']),
+                       pd.read_parquet(inputs['vendors']))
+
+    directory = os.path.join(os.path.dirname(outputs['manifest']), 'reports')
+    shutil.rmtree(directory, ignore_errors=True)  # drop reports of vendors without issues this run
+    manifest = fan_out(df, directory, file_format=file_format)
+    manifest.to_csv(outputs['manifest'], index=False)
+    print(f'Wrote {len(manifest)} reports for {len(df)} issues')
+
+
+def latest_merkle_csv() -> str | None:
+    files = glob.glob(os.path.join(ROOT, 'data', 'input', '*Merkle_output*.csv'))
+
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def build_stages(args: argparse.Namespace) -> list:
+    """ Declares the pipeline stages for the parsed command line
+
+    Args:
+        args (argparse.Namespace): parse_args() result
+
+    Returns:
+        (list): Stage objects
+    """
+    work_dir = args.work_dir
+
+    return [Stage(name='monday_pull',
+                  function=monday_pull,
+                  outputs={'vendors': os.path.join(work_dir, 'monday_vendors.parquet')},
+                  params={'run_date': args.run_date, 'load': args.snowflake_load}),
+            Stage(name='merkle_intake',
+                  function=merkle_intake,
+                  inputs={'merkle_csv': args.merkle_csv},
+                  outputs={'merkle': os.path.join(work_dir, 'merkle.parquet')}),
+            Stage(name='validation',
+                  function=validation,
+                  outputs={'issues': os.path.join(work_dir, 'issues.parquet')},
+                  params={'run_date': args.run_date, 'options': shlex.split(args.validation_args or '')}),
+            Stage(name='vendor_reports',
+                  function=vendor_reports,
+                  inputs={'issues': os.path.join(work_dir, 'issues.parquet'),
+                          'merkle': os.path.join(work_dir, 'merkle.parquet'),
+                          'vendors': os.path.join(work_dir, 'monday_vendors.parquet')},
+                  outputs={'manifest': os.path.join(work_dir, 'report_manifest.csv')},
+                  params={'file_format': args.report_format})]
+
+
+def parse_args(argv: list | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Run the nightly data validation pipeline.')
+    parser.add_argument('--work-dir', default=os.path.join(ROOT, 'data', 'pipeline'),
+                        help='Directory for stage outputs and the pipeline state file.')
+    parser.add_argument('--merkle-csv', default=latest_merkle_csv(),
+                        help='Merkle output CSV. Default: newest data/input/*Merkle_output*.csv.')
+    parser.add_argument('--validation-args', help='Extra Merkle_2.0/main.py arguments, e.g. "--category SUPPLY_CHAIN".')
+    parser.add_argument('--run-date', default=date.today().isoformat(),
+                        help='Run date. Stages reading live systems rerun when it changes. Default: today.')
+    parser.add_argument('--snowflake-load', action='store_true',
+                        help='Also write the Monday pull to Snowflake. Prompts for a username and signs in through '
+                             'the browser, so leave it off for unattended runs.')
+    parser.add_argument('--report-format', choices=['csv', 'parquet'], default='csv',
+                        help='Format of the per-vendor and per-category issue reports.')
+    parser.add_argument('--only', help='Comma separated stages to run, with the stages they depend on.')
+    parser.add_argument('--force', help='Comma separated stages to rerun even when cached.')
+    parser.add_argument('--workers', type=int, default=4, help='Most stages run at once.')
+    parser.add_argument('--list-stages', action='store_true', help='Print the stages with their inputs and outputs and exit.')
+
+    args = parser.parse_args(argv)
+    if not args.merkle_csv:
+        parser.error('no Merkle output CSV found in data/input, pass --merkle-csv')
+
+    return args
+
+
+def split_arg(value: str | None) -> list | None:
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+
+def main(argv: list | None = None):
+    args = parse_args(argv)
+    stages = build_stages(args)
+
+    if args.list_stages:
+        for stage in stages:
+            print(f'{stage.name:<15} inputs: {list(stage.inputs.values())} outputs: {list(stage.outputs.values())}')
+        return
+
+    pipeline = Pipeline(stages, os.path.join(args.work_dir, 'pipeline_state.json'), max_workers=args.workers)
+    try:
+        pipeline.run(only=split_arg(args.only), force=split_arg(args.force))
+    finally:
+        print(pipeline.report())
 
 
 if __name__ == "__main__":
     main()
-
@@ -178,7 +178,12 @@ def write_to_snowflake(df: pd.DataFrame) -> None:
     con.close()
 
 
-def main():
+def pull() -> pd.DataFrame:
+    """ Pulls every item of the certification tracker board
+
+    Returns:
+        mod_df (pandas dataframe): board items with renamed columns and REPORT_DATE
+    """
     # Desired query
     query2 = '''{
         boards(ids: 8283305838) {
@@ -214,7 +219,11 @@ def main():
     df = pd.DataFrame(create_df(extracted_data))
 
     # Modify DataFrame
-    mod_df = modify_df(df)
+    return modify_df(df)
+
+
+def main():
+    mod_df = pull()
 
     # Write Dataframe to excel
     # mod_df.to_excel('MondayData.xlsx')
@@ -0,0 +1,256 @@
+# -*- coding: UTF-8 -*-
+# Description: Stage runner for the nightly pipeline. Stages declare their input and output
+#              files, run concurrently once their inputs exist, are skipped when their input
+#              hash is unchanged and record their progress so a failed run resumes where it stopped.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class Stage:
+    """ One step of the pipeline
+
+    Args:
+        name (str): Unique stage name
+        function (Callable): Called as function(inputs, outputs, **params) with dicts of file paths
+        inputs (dict): Input name to file path. A path produced by another stage makes this stage depend on it
+        outputs (dict): Output name to file path
+        params (dict): Keyword arguments for function. Part of the cache key, so a changed value reruns the stage
+        after (tuple): Names of stages that must finish first without sharing a file
+    """
+    name: str
+    function: Callable
+    inputs: dict = field(default_factory=dict)
+    outputs: dict = field(default_factory=dict)
+    params: dict = field(default_factory=dict)
+    after: tuple = ()
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """ sha256 of a file's contents, read in blocks
+
+    Args:
+        path (str): File to hash
+
+    Returns:
+        (str): hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def stage_key(stage: Stage, hashes: dict) -> str:
+    """ Cache key of a stage: its name, params, declared files and the contents of its inputs
+
+    Args:
+        stage (Stage): Stage to key
+        hashes (dict): Input path to content hash
+
+    Returns:
+        (str): hex digest
+    """
+    payload = {'name': stage.name,
+               'params': stage.params,
+               'inputs': {name: hashes[path] for name, path in sorted(stage.inputs.items())},
+               'outputs': dict(sorted(stage.outputs.items()))}
+
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def dependencies(stages: list) -> dict:
+    """ Stage name to the set of stage names it waits for
+
+    Args:
+        stages (list): Stages of the pipeline
+
+    Returns:
+        (dict): name -> set of names
+    """
+    names = {stage.name for stage in stages}
+    if len(names) != len(stages):
+        raise ValueError('Stage names must be unique')
+
+    producers = {path: stage.name for stage in stages for path in stage.outputs.values()}
+    graph = {}
+    for stage in stages:
+        unknown = set(stage.after) - names
+        if unknown:
+            raise ValueError(f'{stage.name} runs after unknown stages: {", ".join(sorted(unknown))}')
+        graph[stage.name] = {producers[path] for path in stage.inputs.values() if path in producers} | set(stage.after)
+        graph[stage.name].discard(stage.name)
+
+    # Kahn's algorithm, only to reject cycles up front.
+    remaining = {name: set(deps) for name, deps in graph.items()}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f'Stage dependency cycle between: {", ".join(sorted(remaining))}')
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+    return graph
+
+
+class Pipeline:
+    """ Runs stages in dependency order, independent stages concurrently
+
+    A stage is skipped when the state file holds the same cache key and all of its outputs
+    still exist. State is written after every stage, so rerunning a failed pipeline only
+    runs the stages that failed, were not reached or whose inputs changed.
+
+    Args:
+        stages (list): Stages to run
+        state_path (str): JSON file recording completed stages
+        max_workers (int): Most stages run at once
+    """
+
+    def __init__(self, stages: list, state_path: str, max_workers: int = 4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.graph = dependencies(stages)
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self.state = self.load_state()
+        self.state_lock = threading.Lock()
+        self.timings = {}
+
+    def load_state(self) -> dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as file:
+                return json.load(file)
+
+        return {}
+
+    def save_state(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        temp_path = f'{self.state_path}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.state, file, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    def cached(self, stage: Stage, key: str) -> bool:
+        entry = self.state.get(stage.name)
+
+        return (entry is not None and entry['key'] == key
+                and all(os.path.exists(path) for path in stage.outputs.values()))
+
+    def run_stage(self, stage: Stage, force: bool = False) -> str:
+        """ Runs one stage unless its cached result is still valid
+
+        Args:
+            stage (Stage): Stage to run
+            force (bool): Ignore the cache
+
+        Returns:
+            (str): 'cached' or 'done'
+        """
+        start = time.perf_counter()
+        try:
+            missing = [path for path in stage.inputs.values() if not os.path.exists(path)]
+            if missing:
+                raise FileNotFoundError(f'{stage.name} inputs not found: {", ".join(missing)}')
+
+            key = stage_key(stage, {path: file_hash(path) for path in stage.inputs.values()})
+            if not force and self.cached(stage, key):
+                self.timings[stage.name] = ('cached', time.perf_counter() - start)
+                return 'cached'
+
+            for path in stage.outputs.values():
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            stage.function(dict(stage.inputs), dict(stage.outputs), **stage.params)
+        except Exception:
+            self.timings[stage.name] = ('failed', time.perf_counter() - start)
+            raise
+
+        self.timings[stage.name] = ('done', time.perf_counter() - start)
+        with self.state_lock:
+            self.state[stage.name] = {'key': key,
+                                      'outputs': stage.outputs,
+                                      'seconds': round(self.timings[stage.name][1], 3),
+                                      'finished': datetime.now().isoformat(timespec='seconds')}
+            self.save_state()
+
+        return 'done'
+
+    def run(self, only: list | None = None, force: list | None = None) -> dict:
+        """ Runs the pipeline
+
+        Args:
+            only (list): Run these stages and the stages they depend on. Default: every stage
+            force (list): Rerun these stages even when cached
+
+        Returns:
+            (dict): stage name -> (status, seconds) with status 'done', 'cached', 'failed' or 'skipped'
+        """
+        selected = self.closure(only) if only else set(self.stages)
+        force = set(force or [])
+        pending = {name: self.graph[name] & selected for name in selected}
+        finished, failed, skipped, running = set(), {}, set(), {}
+        self.timings = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stage') as executor:
+            while pending or running:
+                for name in [name for name, deps in pending.items() if deps <= finished]:
+                    del pending[name]
+                    running[executor.submit(self.run_stage, self.stages[name], name in force)] = name
+
+                # Stages behind a failed stage can never start.
+                blocked = [name for name, deps in pending.items() if deps & (set(failed) | skipped)]
+                while blocked:
+                    for name in blocked:
+                        del pending[name]
+                        skipped.add(name)
+                        self.timings[name] = ('skipped', 0.0)
+                    blocked = [name for name, deps in pending.items() if deps & skipped]
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is None:
+                        finished.add(name)
+                    else:
+                        failed[name] = future.exception()
+
+        if failed:
+            name, error = next(iter(failed.items()))
+            raise RuntimeError(f'Stage {name} failed: {error}') from error
+
+        return self.timings
+
+    def closure(self, names: list) -> set:
+        unknown = set(names) - set(self.stages)
+        if unknown:
+            raise ValueError(f'Unknown stages: {", ".join(sorted(unknown))}')
+
+        selected, stack = set(), list(names)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.graph[name])
+
+        return selected
+
+    def report(self) -> str:
+        """ Per-stage timings as a text table
+        """
+        lines = [f'{"stage":<20} {"status":<8} {"seconds":>9}']
+        lines += [f'{name:<20} {status:<8} {seconds:>9.2f}' for name, (status, seconds) in self.timings.items()]
+
+        return '\n'.join(lines)
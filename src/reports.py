@@ -0,0 +1,159 @@
+# -*- coding: UTF-8 -*-
+# Description: Fans issue output out into one report file per vendor and per product category
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+UNASSIGNED = 'UNASSIGNED'
+
+REPORT_COLUMNS = ['vendor_id', 'vendor_name', 'product_category', 'material_number', 'alt_uom',
+                  'issue_category', 'issue_code', 'error_message', 'date_discovered', 'date_resolved']
+
+PARTITIONS = {'vendor': ['vendor_id'], 'category': ['product_category']}
+
+
+def vendor_key(series: pd.Series) -> pd.Series:
+    """ Normalizes vendor and SKU numbers so SAP zero padded values match Monday's
+
+    Args:
+        series (pandas series): raw numbers
+
+    Returns:
+        (pandas series): stripped values without leading zeros
+    """
+    return series.astype('string').str.strip().str.lstrip('0')
+
+
+def vendor_issues(issue_df: pd.DataFrame, merkle_df: pd.DataFrame, vendor_df: pd.DataFrame | None = None) -> pd.DataFrame:
+    """ Joins issues to their vendor and product category once
+
+    Args:
+        issue_df (pandas dataframe): Merkle_2.0 issue output
+        merkle_df (pandas dataframe): Merkle output with HDS SKU #, HDS_SUPPLIER_NUMBER, HDS_SUPPLIER_NAME and PCAT
+        vendor_df (pandas dataframe): Monday tracker with VENDOR_ID and VENDOR_NAME. Its names win over Merkle's
+
+    Returns:
+        (pandas dataframe): issues with REPORT_COLUMNS
+    """
+    sku_df = pd.DataFrame({'material_number': vendor_key(merkle_df['HDS SKU #']),
+                           'vendor_id': vendor_key(merkle_df['HDS_SUPPLIER_NUMBER']),
+                           'merkle_vendor_name': merkle_df['HDS_SUPPLIER_NAME'].astype('string'),
+                           'product_category': merkle_df['PCAT'].astype('string')})
+    sku_df = sku_df.drop_duplicates('material_number')
+
+    df = issue_df.assign(material_number=vendor_key(issue_df['material_number']))
+    df = df.merge(sku_df, on='material_number', how='left')
+
+    vendor_name = df['merkle_vendor_name']
+    if vendor_df is not None:
+        names = (pd.DataFrame({'vendor_id': vendor_key(vendor_df['VENDOR_ID']),
+                               'vendor_name': vendor_df['VENDOR_NAME'].astype('string')})
+                 .dropna(subset=['vendor_id'])
+                 .drop_duplicates('vendor_id', keep='last')
+                 .set_index('vendor_id')['vendor_name'])
+        vendor_name = df['vendor_id'].map(names).fillna(vendor_name)
+
+    return df.assign(vendor_name=vendor_name).reindex(columns=REPORT_COLUMNS)
+
+
+def partition_key(values: tuple) -> str:
+    return '|'.join(UNASSIGNED if pd.isna(value) or value == '' else str(value) for value in values)
+
+
+def file_name(key: str, used: set) -> str:
+    """ File name for a partition key, safe on Windows shares. Keys that only differ
+    in unsafe characters get a numeric suffix instead of overwriting each other.
+    """
+    name = base = re.sub(r'[^\w.-]+', '_', key)
+    suffix = 1
+    while name in used:
+        name, suffix = f'{base}_{suffix}', suffix + 1
+    used.add(name)
+
+    return name
+
+
+def partition_bounds(df: pd.DataFrame, keys: list) -> tuple:
+    """ Sorts once by the partition keys and finds where each partition starts
+
+    Args:
+        df (pandas dataframe): rows to partition
+        keys (list): partition columns
+
+    Returns:
+        (sorted dataframe, array of partition start positions with len(df) appended)
+    """
+    df = df.sort_values(keys, kind='stable', na_position='last').reset_index(drop=True)
+    codes = [pd.factorize(df[key], use_na_sentinel=False)[0] for key in keys]
+    changes = np.zeros(len(df), dtype=bool)
+    changes[:1] = True
+    for code in codes:
+        changes[1:] |= code[1:] != code[:-1]
+
+    return df, np.append(np.flatnonzero(changes), len(df))
+
+
+def write_partition(table, path: str) -> None:
+    """ Writes an Arrow table slice. Arrow's writers release the GIL, so partitions write in parallel
+    """
+    import pyarrow.csv as pc
+    import pyarrow.parquet as pq
+
+    if path.endswith('.parquet'):
+        pq.write_table(table, path)
+    else:
+        pc.write_csv(table, path)
+
+
+def fan_out(df: pd.DataFrame, directory: str, partitions: dict | None = None, file_format: str = 'csv',
+            max_workers: int = 8) -> pd.DataFrame:
+    """ Writes one file per partition value for every partitioning, in a single sort per partitioning
+
+    Args:
+        df (pandas dataframe): vendor_issues() output
+        directory (str): report root. Files go to directory/<partitioning>/<key>.<file_format>
+        partitions (dict): partitioning name to key columns. Default: PARTITIONS
+        file_format (str): 'csv' or 'parquet'
+        max_workers (int): files written at once
+
+    Returns:
+        (pandas dataframe): manifest | partition | key | file | issue_count | material_count |
+    """
+    import pyarrow as pa
+
+    partitions = partitions or PARTITIONS
+    manifest, jobs = [], []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for partition, keys in partitions.items():
+            os.makedirs(os.path.join(directory, partition), exist_ok=True)
+            sorted_df, bounds = partition_bounds(df, keys)
+            table = pa.Table.from_pandas(sorted_df.astype({col: 'string' for col in sorted_df.columns
+                                                            if sorted_df[col].dtype == object}),
+                                         preserve_index=False)
+
+            starts = bounds[:-1]
+            part_ids = np.repeat(np.arange(len(starts)), np.diff(bounds))
+            material_counts = pd.Series(sorted_df['material_number'].to_numpy()).groupby(part_ids).nunique()
+            part_keys = sorted_df[keys].iloc[starts].itertuples(index=False, name=None)
+            used = set()
+
+            for part_id, (start, stop, values) in enumerate(zip(starts, bounds[1:], part_keys)):
+                key = partition_key(values)
+                path = os.path.join(directory, partition, f'{file_name(key, used)}.{file_format}')
+                jobs.append(executor.submit(write_partition, table.slice(start, stop - start), path))
+                manifest.append({'partition': partition,
+                                 'key': key,
+                                 'file': os.path.relpath(path, directory),
+                                 'issue_count': int(stop - start),
+                                 'material_count': int(material_counts.get(part_id, 0))})
+
+        for job in jobs:
+            job.result()
+
+    return pd.DataFrame(manifest, columns=['partition', 'key', 'file', 'issue_count', 'material_count'])
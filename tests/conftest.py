@@ -0,0 +1,28 @@
+# -*- coding: UTF-8 -*-
+# Description: Puts the Merkle_2.0 and src scripts on the import path and shares test fixtures
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(ROOT, 'Merkle_2.0'))
+# Appended so Merkle_2.0/main.py keeps precedence over src/main.py.
+sys.path.append(os.path.join(ROOT, 'src'))
+
+from utils import format_df  # noqa: E402
+
+
+@pytest.fixture
+def issues():
+    """
+    Builds SUPPLY_CHAIN issue rows on the CS level for a list of material numbers.
+    """
+    def make(material_numbers: list, issue_code: str) -> pd.DataFrame:
+        df = pd.DataFrame({'material_number': material_numbers, 'alt_uom': 'CS'})
+        return format_df(df, issue_category='SUPPLY_CHAIN', issue_code=issue_code, error_message='message')
+
+    return make
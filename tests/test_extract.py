@@ -0,0 +1,77 @@
+# -*- coding: UTF-8 -*-
+# Description: Arrow extract against a local stand-in
+
+import sqlite3
+import warnings
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from extract import ArrowSource, connector_kwargs
+from harness import material_frame
+from queries import material_dtypes
+from rules import RULES
+
+
+class LocalArrowSource(ArrowSource):
+    """
+    Serves a DataFrame as Arrow record batches the way the Snowflake connector would.
+    """
+
+    def __init__(self, df: pd.DataFrame, batch_size: int = 500):
+        self.table = pa.Table.from_pandas(df, preserve_index=False)
+        self.batch_size = batch_size
+
+    def fetch_arrow_batches(self, sql, params=None):
+        batches = self.table.to_batches(max_chunksize=self.batch_size)
+        yield from batches or [self.table]
+
+
+def issue_counts(df: pd.DataFrame) -> pd.Series:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        issue_df = pd.concat([rule.run(df) for rule in RULES if rule.scope != 'catalog'])
+
+    return issue_df.astype(str).drop(columns=['date_discovered']).value_counts().sort_index()
+
+
+def test_arrow_extract_applies_dtype_map():
+    expected = material_frame(null_rate=0.3)
+    raw = expected.astype({'conversion_numerator': 'int32', 'volume': 'float32'})
+
+    df = LocalArrowSource(raw).read('SELECT', dtype=material_dtypes)
+
+    assert list(df.columns) == list(expected.columns)
+    assert df['conversion_numerator'].dtype == 'int64' and df['volume'].dtype == 'float64'
+    assert df['upc'].dtype == pd.StringDtype('pyarrow')
+    assert issue_counts(df).equals(issue_counts(expected))
+
+
+def test_int64_nulls_raise_like_read_sql_query():
+    df = pd.DataFrame({'material_number': ['1', '2'], 'conversion_numerator': [12, None]})
+    dtype = {'material_number': 'string', 'conversion_numerator': 'int64'}
+    con = sqlite3.connect(':memory:')
+    df.to_sql('marm', con, index=False)
+
+    with pytest.raises(ValueError):
+        pd.read_sql_query('SELECT * FROM marm', con, dtype=dtype)
+    with pytest.raises(ValueError, match='conversion_numerator'):
+        LocalArrowSource(df).read('SELECT', dtype=dtype)
+    with pytest.raises(ValueError, match='conversion_numerator'):
+        list(LocalArrowSource(df, batch_size=1).read_chunks('SELECT', dtype=dtype))
+
+
+def test_arrow_extract_empty_result_keeps_columns():
+    df = LocalArrowSource(pd.DataFrame({'upc': pd.Series([], dtype='string')})).read('SELECT', dtype='string')
+
+    assert list(df.columns) == ['upc'] and df.empty
+
+
+def test_connector_kwargs_from_odbc_string():
+    kwargs = connector_kwargs('Driver={SnowflakeDSIIDriver};Server=data.us-central1.gcp.snowflakecomputing.com;'
+                              'uid=svc_user;pwd=secret;warehouse=DATA_GOVERNANCE_WH1;database=EDP')
+
+    assert kwargs == {'account': 'data.us-central1.gcp', 'user': 'svc_user', 'password': 'secret',
+                      'database': 'EDP', 'warehouse': 'DATA_GOVERNANCE_WH1'}
+    assert connector_kwargs('DSN=Snowflake') is None
@@ -0,0 +1,57 @@
+# -*- coding: UTF-8 -*-
+# Description: Fused bitset evaluation of row-local rules
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fused import FUSED_RULES, bitset_frame, diff_bitsets, issue_bits, read_bitsets, run_fused, write_bitsets
+from harness import material_frame
+
+KEY = ['material_number', 'alt_uom', 'issue_category', 'issue_code', 'error_message']
+
+
+def issue_counts(response_array: list) -> pd.Series:
+    return pd.concat(response_array)[KEY].astype(str).value_counts().sort_index()
+
+
+def test_fused_matches_rule_functions():
+    df = material_frame(null_rate=0.3)
+
+    assert issue_counts(run_fused(df)).equals(issue_counts([rule.run(df) for rule in FUSED_RULES]))
+
+
+def test_fused_subset_only_sets_selected_bits():
+    df = material_frame(null_rate=0.3)
+    bits = issue_bits(df, [FUSED_RULES[-1]])
+
+    assert bits.any()
+    assert not (bits & ~np.uint32(1 << (len(FUSED_RULES) - 1))).any()
+
+
+def test_diff_bitsets():
+    df = pd.DataFrame({'material_number': ['1', '1', '2'], 'alt_uom': ['CS', 'CS', 'EA']})
+    previous = bitset_frame(df, np.array([1, 4, 2], dtype=np.uint32))
+    current = bitset_frame(df, np.array([1, 0, 8], dtype=np.uint32))
+
+    diff = diff_bitsets(previous, current)
+
+    assert set(map(tuple, diff.to_numpy())) == {('1', 'CS', FUSED_RULES[2].issue_code, 'resolved'),
+                                                ('2', 'EA', FUSED_RULES[1].issue_code, 'resolved'),
+                                                ('2', 'EA', FUSED_RULES[3].issue_code, 'new')}
+
+
+def test_stored_bitsets_keep_their_mapping(tmp_path):
+    df = pd.DataFrame({'material_number': ['1', '2'], 'alt_uom': ['CS', 'EA']})
+    path = str(tmp_path / 'bits.parquet')
+    write_bitsets(bitset_frame(df, np.array([1, 2], dtype=np.uint32)), path)
+
+    previous = read_bitsets(path)
+    # A row rule inserted at bit 0 shifts every other bit.
+    current = bitset_frame(df, np.array([2, 4], dtype=np.uint32))
+    current.attrs['issue_bits'] = ['NEW_RULE'] + current.attrs['issue_bits'][:-1]
+
+    assert previous.attrs['issue_bits'] == [rule.issue_code for rule in FUSED_RULES]
+    assert diff_bitsets(previous, read_bitsets(path)).empty
+    with pytest.raises(ValueError, match='different'):
+        diff_bitsets(previous, current)
@@ -0,0 +1,71 @@
+# -*- coding: UTF-8 -*-
+# Description: Candidate engines against the frozen reference procedures
+
+import pandas as pd
+import pytest
+
+import stored_procedures
+from harness import CANDIDATES, RULES, SCENARIOS, Candidate, compare, main, material_frame, reference, run_harness
+
+
+@pytest.mark.parametrize('scenario', list(SCENARIOS))
+def test_candidates_match_reference(scenario):
+    results = run_harness(materials=120, scenarios=[scenario])
+
+    assert set(results['engine']) == {candidate.name for candidate in CANDIDATES}
+    assert results['equal'].all(), results[~results['equal']].to_string()
+    assert (results['speedup'] > 0).all()
+
+
+def test_wrong_engine_is_caught():
+    df = material_frame(120)
+    lost = pd.concat(reference(df, RULES))['material_number'].iloc[0]
+    # Loses a material's rows, as an engine with an off-by-one batch boundary would.
+    broken = Candidate(name='broken',
+                       function=lambda df, rules, mean_df=None: reference(df[df['material_number'] != lost], rules))
+
+    result = compare(df, [broken]).iloc[0]
+
+    assert not result['equal'] and result['missing'] > 0 and result['extra'] == 0
+
+
+def test_rule_change_is_caught(monkeypatch):
+    df = material_frame(120)
+    rules = [rule for rule in RULES if rule.name == 'larger_gross_weight_failure']
+    arrow = next(candidate for candidate in CANDIDATES if candidate.name == 'arrow')
+    # Edited rule: the oracle keeps the frozen tolerances, so the engines running the rule now disagree with it.
+    loosened = stored_procedures.larger_gross_weight_failure
+    monkeypatch.setattr(stored_procedures, 'larger_gross_weight_failure',
+                        lambda df, **kwargs: loosened(df, upper_tolerance=1.0, **kwargs))
+
+    result = compare(df, [arrow], rules).iloc[0]
+
+    assert not result['equal'] and result['missing'] > 0
+
+
+def test_scenarios_are_adversarial():
+    nulls = material_frame(120, **SCENARIOS['nulls'])
+    assert nulls[['base_uom', 'alt_uom', 'upc', 'volume']].isna().any().all()
+
+    one_to_one = material_frame(120, **SCENARIOS['one_to_one'])
+    alt = one_to_one[(one_to_one['base_uom'] != one_to_one['alt_uom']) & (one_to_one['conversion_numerator'] > 0)]
+    assert (alt['conversion_numerator'] == alt['conversion_denominator']).all()
+
+    pallet_only = material_frame(120, **SCENARIOS['pallet_only'])
+    assert set(pallet_only['alt_uom']) == {'EA', 'CS', 'PAL'}
+
+    duplicate_upcs = material_frame(120, **SCENARIOS['duplicate_upcs'])
+    assert duplicate_upcs.dropna(subset='upc').groupby('upc')['material_number'].nunique().gt(1).all()
+
+
+def test_main_appends_results(tmp_path):
+    output = str(tmp_path / 'harness_results.csv')
+    argv = ['--materials', '40', '--seeds', '1', '--scenarios', 'random', '--engines', 'fused,spill',
+            '--repeat', '1', '--output', output]
+
+    main(argv)
+    main(argv)
+
+    results = pd.read_csv(output)
+    assert len(results) == 4 and set(results['engine']) == {'fused', 'spill'}
+    assert results['run_at'].notna().all()
@@ -0,0 +1,140 @@
+# -*- coding: UTF-8 -*-
+# Description: In-house Merkle packaging-level flags
+
+import os
+
+import pandas as pd
+
+from harness import material_frame
+from merkle import LEVELS, MERKLE_COLUMNS, merkle_output
+from queries import material_dtypes
+
+
+MERKLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'data', 'input', 'Example_Merkle_output_2025-05-30_Good.csv')
+
+# material, alt_uom, numerator, upc, length, width, height, volume, gross_weight
+GOOD_LADDER = [('100', 'EA', 1, '012345678905', 2, 2, 2, 8, 1.0),
+               ('100', 'BX', 6, '10012345678902', 4, 4, 3, 48, 6.2),
+               ('100', 'CS', 24, '20012345678909', 8, 8, 6, 384, 25.0),
+               ('100', 'PAL', 960, '30012345678906', 48, 40, 50, 96000, 1010.0)]
+
+
+def ladder(rows: list, base_uom: str = 'EA') -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=['material_number', 'alt_uom', 'conversion_numerator', 'upc', 'length',
+                                     'width', 'height', 'volume', 'gross_weight'])
+    df = df.assign(product_category='Lighting', base_uom=base_uom, conversion_denominator=1)
+
+    return df[list(material_dtypes)].astype(material_dtypes)
+
+
+def merkle_levels(merkle_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rebuilds material_data from a Merkle file: one row per listed packaging level.
+    """
+    frames = [pd.DataFrame({'material_number': merkle_df['HDS SKU #'],
+                            'product_category': merkle_df['PCAT'],
+                            'base_uom': merkle_df['BUOM'],
+                            'alt_uom': merkle_df[f'{level}_PACKAGING_LEVEL'],
+                            'conversion_numerator': merkle_df[f'{level}_QTY_OF_UOM'],
+                            'conversion_denominator': '1',
+                            'upc': merkle_df[f'{level}_UPC'],
+                            'length': merkle_df[f'{level}_LENGTH_'],
+                            'width': merkle_df[f'{level}_WIDTH_'],
+                            'height': merkle_df[f'{level}_HEIGHT_'],
+                            'volume': merkle_df[f'{level}_VOLUM'],
+                            'gross_weight': merkle_df[f'{level}_WEIGHT_']})
+              for level in LEVELS]
+    df = pd.concat(frames, ignore_index=True).dropna(subset='alt_uom')
+
+    return df.astype({col: 'float64' for col in ('conversion_numerator', 'conversion_denominator')}).astype(material_dtypes)
+
+
+def good_sample() -> pd.DataFrame:
+    return pd.read_csv(MERKLE_FILE, dtype='string', encoding='utf-8-sig')
+
+
+def flagged(df: pd.DataFrame, material: str) -> set:
+    row = df[df['HDS SKU #'] == material].iloc[0]
+    message = row['CONCAT_Error_Msg']
+
+    return set() if pd.isna(message) else set(message.split(', '))
+
+
+def test_schema_matches_merkle_file():
+    header = list(pd.read_csv(MERKLE_FILE, nrows=0, encoding='utf-8-sig').columns)
+    df = merkle_output(material_frame(null_rate=0.3))
+
+    assert MERKLE_COLUMNS == header
+    assert list(df.columns) == header
+    assert df['HDS SKU #'].is_unique
+
+
+def test_good_ladder_is_dc_ready():
+    df = merkle_output(ladder(GOOD_LADDER))
+
+    assert df.loc[0, 'DC_Ready'] == 'Yes' and pd.isna(df.loc[0, 'CONCAT_Error_Msg'])
+    assert df.loc[0, 'PKG_PACKAGING_LEVEL'] == 'BX' and df.loc[0, 'PKG_QTY_OF_UOM'] == 6
+    assert df.loc[0, 'CS_QTY_OF_UOM'] == 24 and df.loc[0, 'PAL_UPC'] == '30012345678906'
+    assert df.loc[0, 'BUOM'] == 'EA' and df.loc[0, 'UPC'] == '012345678905'
+
+
+def test_cross_level_flags():
+    rows = [
+        # Case smaller than the each, case quantity not a multiple of the inner pack, pallet reusing the case UPC.
+        ('300', 'EA', 1, '112345678905', 5, 5, 5, 125, 1.0),
+        ('300', 'PK', 5, '11012345678902', 6, 6, 6, 216, 5.0),
+        ('300', 'CS', 12, '11112345678909', 4, 4, 4, 64, 12.0),
+        ('300', 'PAL', 480, '11112345678909', 48, 40, 50, 96000, 480.0),
+    ]
+    # Sold by the case but listed with only an each and an oversized pallet.
+    no_case = [('200', 'EA', 1, '012345678905', 10, 10, 10, 1000, 5.0),
+               ('200', 'PAL', 40, '20012345678909', 96, 72, 72, 497664, 200.0)]
+    df = merkle_output(pd.concat([ladder(no_case, base_uom='CS'), ladder(rows)], ignore_index=True))
+
+    assert flagged(df, '200') == {'Base_QTY_missing', 'Pallet_dims_seem_high'}
+    assert df['Requires Case level'].isna().all()
+    assert {'Case dims < Each dims', 'Case dims < Inner Pack dims', 'Case_QTY_is_incorrect',
+            'Pallet UPC = Case UPC', 'Case_UPC_duplicate_found', 'Pallet_UPC_duplicate_found',
+            'AUOM data < BUOM data'} <= flagged(df, '300')
+    assert df.set_index('HDS SKU #')['DC_Ready'].to_dict() == {'200': 'No', '300': 'No'}
+
+
+def test_weight_and_blank_upc_flags():
+    rows = list(GOOD_LADDER)
+    rows[2] = ('100', 'CS', 24, '0000', 8, 8, 6, 384, 40.0)
+    df = merkle_output(ladder(rows))
+
+    assert flagged(df, '100') == {'Case_weight_incorrect', 'Case_UPC_is_blank_or_0'}
+    assert df.loc[0, 'Case_weight_incorrect'] == 'Yes' and pd.isna(df.loc[0, 'Case_UPC_invalid'])
+
+
+def test_good_sample_is_dc_ready():
+    good = good_sample()
+    df = merkle_output(merkle_levels(good)).set_index('HDS SKU #')
+
+    assert len(df) == 6491 and (df['DC_Ready'] == 'Yes').sum() == 6491
+    assert df['CONCAT_Error_Msg'].isna().all()
+    # Levels below the base unit (a RL under a CS base), equal inner pack quantities, a case weight exactly
+    # 25% over the base weight and UPCs shared with other SKUs are all accepted by Merkle.
+    assert df.loc['320672', 'PKG_PACKAGING_LEVEL'] == 'RL' and df.loc['320672', 'BUOM'] == 'CS'
+    assert df.loc['475200', ['PKG_QTY_OF_UOM', 'PKG2_QTY_OF_UOM']].tolist() == [10, 10]
+    assert df.loc['320126', 'CS_WEIGHT_'] == 19.0 and df.loc['320126', 'WEIGHT_'] == 0.38
+    assert df.loc['218460', 'EA_UPC'] == df.loc['267492', 'EA_UPC'] == '076335246178'
+    pd.testing.assert_series_equal(df['PAL_UPC'].astype('string'), good.set_index('HDS SKU #').loc[df.index, 'PAL_UPC'])
+
+
+def test_good_sample_with_faults():
+    good = good_sample().set_index('HDS SKU #')
+    good.loc['320126', 'CS_WEIGHT_'] = '19.5'
+    good.loc['157755', 'PAL_UPC'] = good.loc['157755', 'CS_UPC']
+    good.loc['108270', 'CS_QTY_OF_UOM'] = '50'
+    good.loc['967821', 'CS_PACKAGING_LEVEL'] = pd.NA
+    df = merkle_output(merkle_levels(good.reset_index()))
+
+    assert (df['DC_Ready'] == 'Yes').sum() == 6487
+    assert flagged(df, '320126') == {'Case_weight_incorrect'}
+    assert flagged(df, '157755') == {'Case_UPC_duplicate_found', 'Pallet_UPC_duplicate_found', 'Pallet UPC = Case UPC'}
+    assert flagged(df, '108270') == {'UOM_and_PKG_Qty_mismatch', 'Case_QTY_is_incorrect', 'Case_weight_incorrect'}
+    # Without its CS base row every level is validated, down to the empty EA.
+    assert flagged(df, '967821') == {'Base_QTY_missing', 'Each dims = 0', 'Each weight = 0', 'Each_UPC_is_blank_or_0'}
@@ -0,0 +1,100 @@
+# -*- coding: UTF-8 -*-
+# Description: Stage caching, concurrency and resume of the pipeline runner
+
+import threading
+
+import pytest
+
+from pipeline import Pipeline, Stage, dependencies
+
+
+def copy_stage(name: str, source: str, target: str, calls: list, fail: dict | None = None) -> Stage:
+    def copy(inputs, outputs):
+        calls.append(name)
+        if fail and fail.get(name):
+            raise RuntimeError(f'{name} broke')
+        with open(inputs['source']) as file, open(outputs['target'], 'w') as out:
+            out.write(file.read().upper())
+
+    return Stage(name=name, function=copy, inputs={'source': source}, outputs={'target': target})
+
+
+def test_unchanged_stages_are_cached_and_changed_inputs_rerun(tmp_path):
+    (tmp_path / 'raw.txt').write_text('a')
+    calls = []
+    stages = [copy_stage('clean', str(tmp_path / 'raw.txt'), str(tmp_path / 'clean.txt'), calls),
+              copy_stage('report', str(tmp_path / 'clean.txt'), str(tmp_path / 'report.txt'), calls)]
+    state = str(tmp_path / 'state.json')
+
+    Pipeline(stages, state).run()
+    timings = Pipeline(stages, state).run()
+
+    assert calls == ['clean', 'report']
+    assert {status for status, _ in timings.values()} == {'cached'}
+
+    (tmp_path / 'raw.txt').write_text('b')
+    Pipeline(stages, state).run()
+
+    assert calls == ['clean', 'report', 'clean', 'report']
+    assert (tmp_path / 'report.txt').read_text() == 'B'
+
+
+def test_failed_run_resumes_from_last_completed_stage(tmp_path):
+    (tmp_path / 'raw.txt').write_text('a')
+    calls, fail = [], {'report': True}
+    stages = [copy_stage('clean', str(tmp_path / 'raw.txt'), str(tmp_path / 'clean.txt'), calls, fail),
+              copy_stage('report', str(tmp_path / 'clean.txt'), str(tmp_path / 'report.txt'), calls, fail),
+              copy_stage('publish', str(tmp_path / 'report.txt'), str(tmp_path / 'publish.txt'), calls, fail)]
+    pipeline = Pipeline(stages, str(tmp_path / 'state.json'))
+
+    with pytest.raises(RuntimeError, match='report'):
+        pipeline.run()
+    assert pipeline.timings['publish'] == ('skipped', 0.0)
+
+    fail['report'] = False
+    timings = Pipeline(stages, str(tmp_path / 'state.json')).run()
+
+    assert calls == ['clean', 'report', 'report', 'publish']
+    assert timings['clean'][0] == 'cached'
+
+
+def test_independent_stages_run_concurrently(tmp_path):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(inputs, outputs):
+        barrier.wait()  # raises BrokenBarrierError unless both stages are running at once
+        open(outputs['out'], 'w').close()
+
+    stages = [Stage(name=name, function=meet, outputs={'out': str(tmp_path / f'{name}.txt')}) for name in ('a', 'b')]
+    timings = Pipeline(stages, str(tmp_path / 'state.json'), max_workers=2).run()
+
+    assert {status for status, _ in timings.values()} == {'done'}
+
+
+def test_dependencies_follow_shared_files_and_reject_cycles():
+    stages = [Stage(name='a', function=print, inputs={'x': 'b.txt'}, outputs={'y': 'a.txt'}),
+              Stage(name='b', function=print, outputs={'y': 'b.txt'}),
+              Stage(name='c', function=print, after=('a',))]
+
+    assert dependencies(stages) == {'a': {'b'}, 'b': set(), 'c': {'a'}}
+
+    with pytest.raises(ValueError, match='cycle'):
+        dependencies([Stage(name='a', function=print, inputs={'x': 'b.txt'}, outputs={'y': 'a.txt'}),
+                      Stage(name='b', function=print, inputs={'x': 'a.txt'}, outputs={'y': 'b.txt'})])
+
+
+def test_nightly_run_does_not_load_snowflake_by_default(tmp_path):
+    import importlib.util
+    import os
+
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'main.py')
+    spec = importlib.util.spec_from_file_location('pipeline_main', path)
+    pipeline_main = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(pipeline_main)
+
+    argv = ['--work-dir', str(tmp_path), '--merkle-csv', 'merkle.csv']
+    stages = {stage.name: stage for stage in pipeline_main.build_stages(pipeline_main.parse_args(argv))}
+    assert stages['monday_pull'].params['load'] is False
+
+    stages = {stage.name: stage for stage in pipeline_main.build_stages(pipeline_main.parse_args(argv + ['--snowflake-load']))}
+    assert stages['monday_pull'].params['load'] is True
@@ -0,0 +1,55 @@
+# -*- coding: UTF-8 -*-
+# Description: Per-vendor and per-category report fan-out
+
+import numpy as np
+import pandas as pd
+
+from reports import fan_out, vendor_issues
+
+
+def report_inputs(skus: int = 2000, vendors: int = 150, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    merkle_df = pd.DataFrame({'HDS SKU #': np.arange(skus).astype(str),
+                              'HDS_SUPPLIER_NUMBER': [f'{v:010d}' for v in rng.integers(1, vendors, skus)],
+                              'HDS_SUPPLIER_NAME': 'merkle name',
+                              'PCAT': rng.choice(['Faucets', 'Lamps & Ballasts', 'Filters/HVAC'], skus)}).astype('string')
+    vendor_df = pd.DataFrame({'VENDOR_ID': ['1', '2', '2'], 'VENDOR_NAME': ['Acme', 'Old Name', 'New Name']})
+    issue_df = pd.DataFrame({'material_number': rng.integers(0, skus + 50, skus * 3).astype(str),
+                             'alt_uom': 'EA',
+                             'issue_category': 'SUPPLY_CHAIN',
+                             'issue_code': rng.choice(['NO_UPC', 'INVALID_UPC'], skus * 3),
+                             'error_message': 'message'})
+
+    return issue_df, merkle_df, vendor_df
+
+
+def test_vendor_issues_joins_vendor_and_category():
+    issue_df, merkle_df, vendor_df = report_inputs()
+    df = vendor_issues(issue_df, merkle_df, vendor_df)
+
+    assert len(df) == len(issue_df)
+    assert df['vendor_id'].dropna().str.startswith('0').sum() == 0
+    assert set(df.loc[df['vendor_id'] == '2', 'vendor_name']) <= {'New Name'}
+    assert set(df.loc[~df['vendor_id'].isin(['1', '2']) & df['vendor_id'].notna(), 'vendor_name']) == {'merkle name'}
+    # Issues on SKUs missing from the Merkle file stay, without a vendor.
+    assert df['vendor_id'].isna().sum() == (issue_df['material_number'].astype(int) >= 2000).sum()
+
+
+def test_fan_out_matches_filtering_per_partition(tmp_path):
+    df = vendor_issues(*report_inputs())
+    manifest = fan_out(df, str(tmp_path), max_workers=4)
+
+    vendor_manifest = manifest[manifest['partition'] == 'vendor']
+    assert vendor_manifest['issue_count'].sum() == len(df)
+    assert manifest.loc[manifest['partition'] == 'category', 'issue_count'].sum() == len(df)
+    assert 'UNASSIGNED' in set(vendor_manifest['key'])
+
+    for row in vendor_manifest.sample(10, random_state=0).itertuples():
+        report = pd.read_csv(tmp_path / row.file, dtype='string')
+        expected = df[df['vendor_id'].fillna('UNASSIGNED') == row.key]
+        assert len(report) == row.issue_count == len(expected)
+        assert report['material_number'].nunique() == row.material_count
+
+    category_files = set(manifest.loc[manifest['partition'] == 'category', 'file'])
+    assert category_files == {'category/Faucets.csv', 'category/Lamps_Ballasts.csv', 'category/Filters_HVAC.csv',
+                              'category/UNASSIGNED.csv'}
@@ -0,0 +1,29 @@
+# -*- coding: UTF-8 -*-
+# Description: Streaming issue rollups
+
+import pandas as pd
+
+from rollup import RollupSink
+from sinks import TeeSink
+
+
+def test_rollup_counts_across_writes(tmp_path, issues):
+    material_df = pd.DataFrame({'material_number': ['1', '1', '2', '3'],
+                                'product_category': ['Lighting', 'Lighting', 'Plumbing', None],
+                                'base_uom': ['EA', 'EA', 'CS', 'EA']})
+    output = tmp_path / 'summary.csv'
+    rollup = RollupSink(material_df, str(output))
+
+    with TeeSink(rollup):
+        rollup.write(issues(['1', '2'], 'NO_UPC'))
+        rollup.write(pd.DataFrame())
+        rollup.write(issues(['1', '3', '3'], 'NO_UPC'))
+        rollup.write(issues(['3'], 'INVALID_UPC'))
+
+    expected = [('INVALID_UPC', None, 'EA', 1),
+                ('NO_UPC', 'Lighting', 'EA', 2),
+                ('NO_UPC', 'Plumbing', 'CS', 1),
+                ('NO_UPC', None, 'EA', 2)]
+
+    assert list(rollup.summary().itertuples(index=False, name=None)) == expected
+    assert pd.read_csv(output)['issue_count'].sum() == 6
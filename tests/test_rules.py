@@ -0,0 +1,99 @@
+# -*- coding: UTF-8 -*-
+# Description: Rule registry selection and extract pushdown
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from harness import material_frame
+import main
+from main import material_filter
+from queries import material_query
+from rules import RULES, required_columns, row_filter, select_rules
+
+
+def test_select_by_issue_code_and_name():
+    rules = select_rules(['INVALID_UPC', 'NO_UPC', 'larger_alt_volume'])
+    assert [rule.name for rule in rules] == ['larger_alt_volume', 'invalid_gtin', 'upc_required']
+
+
+def test_select_unknown_rule_raises():
+    with pytest.raises(ValueError):
+        select_rules(['NOT_A_RULE'])
+    with pytest.raises(ValueError):
+        select_rules(categories=['NOT_A_CATEGORY'])
+
+
+def test_unknown_rule_is_a_usage_error(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main.main(['--rules', 'NOT_A_RULE', '--list-rules'])
+
+    assert exit_info.value.code == 2
+    assert 'Unknown rule(s): NOT_A_RULE' in capsys.readouterr().err
+
+
+def test_row_rules_push_down_columns_and_predicate():
+    rules = select_rules(['INVALID_UPC', 'NO_UPC'])
+    sql = material_query(columns=required_columns(rules), filters=[row_filter(rules)])
+
+    assert required_columns(rules) == ['material_number', 'base_uom', 'alt_uom', 'conversion_numerator',
+                                       'conversion_denominator', 'upc']
+    assert 'marm.brgew' not in sql
+    assert '(marm.ean11 IS NOT NULL) OR (marm.ean11 IS NULL)' in sql
+
+
+def test_material_rule_disables_row_predicate():
+    assert row_filter(select_rules(['NO_UPC', 'MISSING_AUOM'])) is None
+
+
+def test_material_filter_list_and_range():
+    assert material_filter('00100, 200') == ('LTRIM(mara.matnr, 0) IN (?, ?)', ['100', '200'])
+    assert material_filter('100-200') == ('TRY_TO_NUMBER(LTRIM(mara.matnr, 0)) BETWEEN ? AND ?', [100, 200])
+    assert material_filter('ABC-DEF') == ('LTRIM(mara.matnr, 0) IN (?)', ['ABC-DEF'])
+    assert material_filter('A100-7, 200') == ('LTRIM(mara.matnr, 0) IN (?, ?)', ['A100-7', '200'])
+
+
+@pytest.mark.parametrize('materials, message', [('200-100', 'ends before it starts'), (' , ', 'No material numbers')])
+def test_bad_materials_are_usage_errors(capsys, materials, message):
+    with pytest.raises(SystemExit) as exit_info:
+        main.parse_args(['--materials', materials])
+
+    assert exit_info.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('sample', ['0', '-0.1', '1.5'])
+def test_sample_outside_unit_interval_is_a_usage_error(capsys, sample):
+    with pytest.raises(SystemExit) as exit_info:
+        main.parse_args(['--sample', sample])
+
+    assert exit_info.value.code == 2
+    assert '--sample must be a fraction in (0, 1]' in capsys.readouterr().err
+    assert main.parse_args(['--sample', '1']).sample == 1
+
+
+def test_list_rules_does_not_import_pandas():
+    code = 'import sys, main; main.main(["--list-rules"]); assert "pandas" not in sys.modules'
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(main.__file__),
+                            capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert len(result.stdout.splitlines()) == len(RULES)
+
+
+def test_snapshot_keeps_requested_materials(tmp_path):
+    path = str(tmp_path / 'snapshot.parquet')
+    df = material_frame()
+    df['material_number'] = df['material_number'].str.zfill(10)
+    df.to_parquet(path)
+    numbers = sorted(df['material_number'].astype(int).unique())
+    low, high = numbers[10], numbers[19]
+
+    listed, _ = main.load_snapshot(path, materials=f'{numbers[0]}, {numbers[1]:010d}')
+    ranged, _ = main.load_snapshot(path, materials=f'{low}-{high}')
+
+    assert set(listed['material_number']) == {f'{numbers[0]:010d}', f'{numbers[1]:010d}'}
+    assert set(ranged['material_number'].astype(int)) == set(numbers[10:20])
+    assert len(ranged) == df['material_number'].astype(int).between(low, high).sum()
@@ -0,0 +1,46 @@
+# -*- coding: UTF-8 -*-
+# Description: Stratified sample preview estimates
+
+import numpy as np
+import pandas as pd
+
+from harness import material_frame
+from sampling import estimate_issue_counts, material_strata, stratified_sample
+
+
+def issues(df: pd.DataFrame, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    flagged = df[rng.random(len(df)) < np.where(df['product_category'].eq('Filters/HVAC').fillna(False), 0.3, 0.05)]
+    return flagged.assign(issue_code=np.where(flagged['alt_uom'] == 'EA', 'NO_UPC', 'MISSING_WEIGHT'))
+
+
+def test_sample_keeps_every_stratum():
+    strata_df = material_strata(material_frame(materials=4000))
+    sample_df = stratified_sample(strata_df, 0.01, seed=3)
+
+    strata = strata_df.groupby(['product_category', 'ladder_depth'], dropna=False).size()
+
+    assert len(sample_df.drop_duplicates(['product_category', 'ladder_depth'])) == len(strata)
+    assert len(sample_df) == np.ceil(strata * 0.01).sum()
+
+
+def test_full_sample_is_exact():
+    df = material_frame(materials=4000)
+    issue_df = issues(df)
+
+    estimate = estimate_issue_counts(issue_df, stratified_sample(material_strata(df), 1.0)).set_index('issue_code')
+    actual = issue_df['issue_code'].value_counts()
+
+    assert (estimate['estimate'] == actual.reindex(estimate.index)).all()
+    assert (estimate['std_error'] == 0).all()
+
+
+def test_interval_covers_actual_count():
+    df = material_frame(materials=4000)
+    issue_df = issues(df)
+    sample_df = stratified_sample(material_strata(df), 0.2, seed=7)
+
+    estimate = estimate_issue_counts(issue_df, sample_df).set_index('issue_code')
+    actual = issue_df['issue_code'].value_counts().reindex(estimate.index)
+
+    assert ((estimate['ci_low'] <= actual) & (actual <= estimate['ci_high'])).all()
@@ -0,0 +1,86 @@
+# -*- coding: UTF-8 -*-
+# Description: Streaming issue sinks
+
+from datetime import date
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from sinks import ISSUE_COLUMNS, DatabaseSink, open_sink
+
+
+@pytest.mark.parametrize('file_name, reader', [
+    ('issues.csv.gz', lambda path: pd.read_csv(path, dtype={'material_number': str})),
+    ('issues.parquet', pd.read_parquet),
+    ('issues.arrow', pd.read_feather),
+])
+def test_sink_round_trip(tmp_path, issues, file_name, reader):
+    path = str(tmp_path / file_name)
+
+    with open_sink(path) as sink:
+        sink.write(issues(['1', '2'], 'NO_UPC'))
+        sink.write(pd.DataFrame())
+        sink.write(issues(['3'], 'INVALID_UPC'))
+
+    result = reader(path)
+
+    assert list(result.columns) == ISSUE_COLUMNS
+    assert list(result['material_number']) == ['1', '2', '3']
+    assert list(result['issue_code']) == ['NO_UPC', 'NO_UPC', 'INVALID_UPC']
+    assert str(result['date_discovered'][0])[:10] == str(date.today())
+
+
+def test_empty_csv_keeps_header(tmp_path):
+    path = tmp_path / 'issues.csv'
+
+    with open_sink(str(path)):
+        pass
+
+    assert path.read_text().strip() == ','.join(ISSUE_COLUMNS)
+
+
+@pytest.mark.parametrize('file_name', ['issues.csv', 'issues.csv.gz'])
+def test_resumed_csv_keeps_earlier_rows(tmp_path, issues, file_name):
+    path = str(tmp_path / file_name)
+
+    with open_sink(path) as sink:
+        sink.write(issues(['1'], 'NO_UPC'))
+    with open_sink(path, append=True) as sink:
+        sink.write(issues(['2'], 'NO_UPC'))
+
+    result = pd.read_csv(path, dtype={'material_number': str})
+    assert list(result['material_number']) == ['1', '2']
+
+
+def test_resume_refuses_to_overwrite_parquet(tmp_path):
+    path = tmp_path / 'issues.parquet'
+    path.write_bytes(b'earlier deltas')
+
+    with pytest.raises(ValueError):
+        open_sink(str(path), append=True)
+    assert path.read_bytes() == b'earlier deltas'
+
+
+def test_background_errors_surface_on_close(tmp_path):
+    sink = open_sink(str(tmp_path / 'issues.parquet'))
+    sink.write(pd.DataFrame({'material_number': ['1']}))
+
+    with pytest.raises(KeyError):
+        sink.close()
+
+
+
+def test_database_sink_resolves_open_rows(tmp_path, issues):
+    path = str(tmp_path / 'issues.db')
+    with sqlite3.connect(path) as con:
+        con.execute(f'CREATE TABLE issues ({", ".join(ISSUE_COLUMNS)})')
+
+    with DatabaseSink('issues', con=sqlite3.connect(path)) as sink:
+        sink.write(issues(['1', '2'], 'NO_UPC'))
+    with DatabaseSink('issues', con=sqlite3.connect(path)) as sink:
+        sink.write(issues(['2'], 'NO_UPC').assign(date_resolved=date(2025, 6, 1)))
+
+    with sqlite3.connect(path) as con:
+        rows = con.execute('SELECT material_number, date_resolved FROM issues ORDER BY material_number').fetchall()
+    assert rows == [('1', None), ('2', '2025-06-01')]
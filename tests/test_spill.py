@@ -0,0 +1,98 @@
+# -*- coding: UTF-8 -*-
+# Description: Out-of-core duplicate UPC detection
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from spill import SpillPartitioner, bucket_duplicates, catalog_chunks, duplicate_upcs, parse_size
+from stored_procedures import unique_upc
+from utils import upc_collapse
+
+
+def upc_data(rows: int = 20_000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'upc': rng.integers(0, rows, rows).astype(str),
+                       'material_number': rng.integers(0, rows // 4, rows).astype(str),
+                       'alt_uom': rng.choice(['EA', 'CS', 'PAL'], rows)}).astype('string')
+    df.loc[rng.random(rows) < 0.02, 'upc'] = pd.NA
+
+    return df
+
+
+def normalized(df: pd.DataFrame) -> list:
+    return sorted(df[['material_number', 'alt_uom', 'error_message']].astype(str).itertuples(index=False))
+
+
+def test_parse_size():
+    assert parse_size('512MB') == 512 * 1024 ** 2
+    assert parse_size('1.5g') == int(1.5 * 1024 ** 3)
+    assert parse_size('2048') == parse_size(2048) == 2048
+    with pytest.raises(ValueError):
+        parse_size('lots')
+
+
+def test_spilled_duplicates_match_in_memory(tmp_path):
+    df = upc_data()
+    chunks = [df.iloc[start:start + 1000] for start in range(0, len(df), 1000)]
+
+    # A budget far below one bucket forces spilling and re-partitioning.
+    spilled = duplicate_upcs(chunks, '16KB', directory=str(tmp_path), fanout=4)
+
+    assert normalized(spilled) == normalized(bucket_duplicates(df))
+    assert not os.listdir(tmp_path)
+
+
+def test_vendor_catalog_duplicates_across_sources(tmp_path):
+    mean_df = pd.DataFrame({'upc': ['111', '222'], 'material_number': ['1', '2'], 'alt_uom': ['EA', 'EA']})
+    catalog_df = pd.DataFrame({'upc': ['111', '333'], 'material_number': ['9', '8'], 'alt_uom': ['CS', 'CS']})
+    catalog_df.to_csv(tmp_path / 'vendor.csv', index=False)
+
+    dup_df = duplicate_upcs([mean_df, *catalog_chunks(str(tmp_path / 'vendor.csv'), chunksize=1)], '1MB')
+
+    assert sorted(dup_df['material_number']) == ['1', '9']
+    assert set(dup_df['error_message']) == {"Duplicate UPC {'111': ['1 - EA', '9 - CS']}"}
+
+
+def test_unique_upc_with_precomputed_duplicates():
+    mean_df = pd.DataFrame({'upc': ['111', '111', '222'], 'material_number': ['1', '2', '3'],
+                            'alt_uom': ['EA', 'CS', 'EA']}).astype('string')
+    material_df = pd.DataFrame({'material_number': ['1', '2', '3'], 'alt_uom': ['EA', 'CS', 'EA']}).astype('string')
+
+    issue_df = unique_upc(material_df, duplicate_upc_df=duplicate_upcs([mean_df], '1MB'))
+
+    # Same messages as the duplicate_upc query path builds with upc_collapse.
+    collapsed = (mean_df[mean_df['upc'] == '111']
+                 .assign(error_message=lambda df: df['material_number'] + ' - ' + df['alt_uom'])
+                 .groupby('upc').agg(upc_collapse)['error_message'].iloc[0])
+    assert set(issue_df['error_message']) == {f"Duplicate UPC {str({'111': collapsed})}"}
+    assert sorted(issue_df['material_number']) == ['1', '2']
+
+
+def open_files_under(directory: str) -> list:
+    fd_dir = '/proc/self/fd'
+    if not os.path.isdir(fd_dir):
+        pytest.skip('needs /proc/self/fd')
+
+    paths = []
+    for fd in os.listdir(fd_dir):
+        try:
+            paths.append(os.readlink(os.path.join(fd_dir, fd)))
+        except OSError:
+            continue
+
+    return [path for path in paths if path.startswith(directory)]
+
+
+def test_partitioner_close_releases_bucket_files(tmp_path):
+    partitioner = SpillPartitioner(str(tmp_path), 16)
+    partitioner.add(upc_data(2000))
+
+    assert open_files_under(str(tmp_path))
+
+    partitioner.close()
+
+    assert open_files_under(str(tmp_path)) == []
+    assert len(list(partitioner.buckets())) == 16
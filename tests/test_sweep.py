@@ -0,0 +1,56 @@
+# -*- coding: UTF-8 -*-
+# Description: Vectorized threshold sweeps match the rule functions
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from harness import material_frame
+from stored_procedures import larger_gross_weight_failure, missing_alternate_uom, pallet_case_fault_tolerance
+from sweep import pallet_volume_sweep, weight_exemption_sweep, weight_tolerance_sweep
+
+
+def material_data() -> pd.DataFrame:
+    # Scale harness weights and volumes off their numerators so every swept threshold moves the counts.
+    df = material_frame(materials=600)
+    return df.assign(gross_weight=df['gross_weight'] * np.resize([0.8, 0.93, 1.0, 1.2, 1.28, 1.4], len(df)),
+                     volume=df['volume'] * np.resize([1.0, 1.5, 2.3, 2.6, 3.0], len(df)))
+
+
+def run(rule, df, **kwargs) -> pd.DataFrame:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return rule(df, **kwargs)
+
+
+def test_weight_tolerance_sweep():
+    df = material_data()
+    sweep_df = weight_tolerance_sweep(df, [0.25, 0.30], [-0.05, -0.10, 0.5], skus=True)
+
+    for row in sweep_df.itertuples():
+        issue_df = run(larger_gross_weight_failure, df, upper_tolerance=row.upper_tolerance,
+                       lower_tolerance=row.lower_tolerance)
+        assert row.issue_count == len(issue_df)
+        assert row.materials == sorted(set(issue_df['material_number']))
+
+
+def test_pallet_volume_sweep():
+    df = material_data()
+    sweep_df = pallet_volume_sweep(df, [0.5, 1.2, 1.5], skus=True)
+
+    assert sweep_df['issue_count'].is_monotonic_decreasing
+    for row in sweep_df.itertuples():
+        issue_df = run(pallet_case_fault_tolerance, df, tolerance=row.tolerance)
+        assert row.issue_count == len(issue_df)
+        assert row.materials == sorted(set(issue_df['material_number']))
+
+
+def test_weight_exemption_sweep():
+    df = material_data()
+    sweep_df = weight_exemption_sweep(df, [20, 26, 30, 40], skus=True)
+
+    for row in sweep_df.itertuples():
+        issue_df = run(missing_alternate_uom, df, weight_exemption=row.weight_exemption)
+        assert row.issue_count == len(issue_df)
+        assert row.materials == sorted(set(issue_df['material_number']))
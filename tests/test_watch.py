@@ -0,0 +1,191 @@
+# -*- coding: UTF-8 -*-
+# Description: Change log micro-batch validation
+
+import sqlite3
+import threading
+
+import pandas as pd
+
+from main import batch_duplicate_upcs
+from utils import format_df
+from watch import ChangeLogFeed, MicroBatcher, Watcher, issue_deltas, load_issues
+
+
+class ListSink:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, df):
+        self.frames.append(df)
+
+
+def change_log(*materials: str) -> sqlite3.Connection:
+    con = sqlite3.connect(':memory:', check_same_thread=False)
+    con.execute('CREATE TABLE change_log (change_id INTEGER PRIMARY KEY AUTOINCREMENT, material_number TEXT)')
+    con.executemany('INSERT INTO change_log (material_number) VALUES (?)', [(m,) for m in materials])
+    return con
+
+
+def issues(*keys: tuple) -> pd.DataFrame:
+    df = pd.DataFrame(list(keys), columns=['material_number', 'alt_uom', 'issue_code'])
+    return pd.concat([format_df(group.copy(), 'SUPPLY_CHAIN', code, code)
+                      for code, group in df.groupby('issue_code')]) if keys else pd.DataFrame()
+
+
+def test_feed_reads_past_offset():
+    con = change_log('1', '2', '1')
+    feed = ChangeLogFeed(con, 'change_log', offset=1)
+
+    assert feed.poll() == (['2', '1'], 3)
+    assert feed.poll() == ([], 3)
+
+
+def test_feed_limit_leaves_the_rest_for_later_polls():
+    con = change_log('1', '2', '3')
+    feed = ChangeLogFeed(con, 'change_log')
+
+    assert feed.poll(limit=2) == (['1', '2'], 2)
+    assert feed.poll(limit=2) == (['3'], 3)
+
+
+def test_batcher_coalesces_duplicates():
+    batcher = MicroBatcher(max_size=2, max_wait=3600)
+    batcher.add(['1', '1'], 2)
+
+    assert not batcher.ready()
+
+    batcher.add(['2'], 3)
+
+    assert batcher.ready()
+    assert batcher.take() == (['1', '2'], 3)
+
+
+def test_issue_deltas_new_and_resolved():
+    open_issues, delta = issue_deltas(pd.DataFrame(columns=issues(('0', 'EA', 'NO_UPC')).columns), ['1', '2'],
+                                      issues(('1', 'CS', 'NO_UPC'), ('2', 'EA', 'INVALID_UPC')))
+    assert len(open_issues) == 2 and delta['date_resolved'].isna().all()
+
+    open_issues, delta = issue_deltas(open_issues, ['1'], issues(('1', 'PAL', 'NO_UPC')))
+
+    assert set(zip(delta['alt_uom'], delta['date_resolved'].notna())) == {('PAL', False), ('CS', True)}
+    assert set(open_issues['alt_uom']) == {'EA', 'PAL'}
+
+
+def test_watcher_validates_changed_materials(tmp_path):
+    con = change_log('1', '2', '1')
+    validated = []
+
+    def validate(materials):
+        validated.append(materials)
+        return issues(*[(material, 'EA', 'NO_UPC') for material in materials])
+
+    sink = ListSink()
+    offset_path = tmp_path / 'offset.txt'
+    watcher = Watcher(ChangeLogFeed(con, 'change_log'), validate, sink, interval=0, max_batch=10,
+                      offset_path=str(offset_path))
+    watcher.run(max_polls=3)
+
+    assert validated == [['1', '2']]
+    assert len(pd.concat(sink.frames)) == 2
+    assert Watcher.load_offset(str(offset_path)) == 3
+
+
+def test_watcher_splits_a_backlog_into_max_batch_batches(tmp_path):
+    con = change_log(*[str(i) for i in range(5000)])
+    batches = []
+
+    def validate(materials):
+        batches.append(len(materials))
+        return pd.DataFrame()
+
+    offset_path = tmp_path / 'offset.txt'
+    watcher = Watcher(ChangeLogFeed(con, 'change_log'), validate, ListSink(), interval=0, max_batch=1000,
+                      max_pending=10, offset_path=str(offset_path))
+    watcher.run(max_polls=10)
+
+    assert batches == [1000] * 5
+    assert Watcher.load_offset(str(offset_path)) == 5000
+
+
+def test_watcher_resumes_open_issues_after_restart(tmp_path):
+    offset_path = str(tmp_path / 'offset.txt')
+    found = {'1': [('1', 'EA', 'NO_UPC'), ('1', 'CS', 'NO_UPC')], '2': [('2', 'EA', 'NO_UPC')]}
+
+    def validate(materials):
+        return issues(*[key for material in materials for key in found[material]])
+
+    first = ListSink()
+    Watcher(ChangeLogFeed(change_log('1', '2'), 'change_log'), validate, first, interval=0,
+            offset_path=offset_path).run(max_polls=1)
+
+    # The steward fixes the CS UPC of material 1 while the watcher is down.
+    found['1'] = [('1', 'EA', 'NO_UPC')]
+    con = change_log('1', '2', '1')
+    second = ListSink()
+    Watcher(ChangeLogFeed(con, 'change_log', offset=Watcher.load_offset(offset_path)), validate, second,
+            interval=0, offset_path=offset_path).run(max_polls=1)
+
+    delta = pd.concat(second.frames)
+    assert len(pd.concat(first.frames)) == 3
+    assert list(zip(delta['alt_uom'], delta['date_resolved'].notna())) == [('CS', True)]
+
+
+def test_watcher_resolves_issues_seeded_from_a_full_run(tmp_path):
+    nightly = str(tmp_path / 'error_output.csv')
+    issues(('1', 'EA', 'NO_UPC'), ('2', 'EA', 'NO_UPC')).to_csv(nightly, index=False)
+    sink = ListSink()
+
+    watcher = Watcher(ChangeLogFeed(change_log('2'), 'change_log'), lambda materials: pd.DataFrame(), sink,
+                      interval=0, offset_path=str(tmp_path / 'offset.txt'), open_issues=load_issues(nightly))
+    watcher.run(max_polls=1)
+
+    delta = pd.concat(sink.frames)
+    assert list(zip(delta['material_number'], delta['date_resolved'].notna())) == [('2', True)]
+    assert list(watcher.open_issues['material_number']) == ['1']
+
+
+def test_batch_duplicate_upcs_reads_only_the_batch():
+    class MeanSource:
+        def read(self, sql, params=None, dtype=None):
+            self.params = params
+            return pd.DataFrame({'material_number': ['1', '9', '1'], 'alt_uom': ['EA', 'EA', 'CS'],
+                                 'upc': ['012345678905', '012345678905', '10012345678902']}, dtype='string')
+
+    source = MeanSource()
+    duplicate_upc_df = batch_duplicate_upcs(source, ['0001'])
+
+    assert source.params == ['1']
+    assert list(zip(duplicate_upc_df['material_number'], duplicate_upc_df['alt_uom'])) == [('1', 'EA'), ('9', 'EA')]
+    assert duplicate_upc_df['error_message'].iloc[0] == "Duplicate UPC {'012345678905': ['1 - EA', '9 - EA']}"
+
+
+def test_watcher_stops_polling_when_batches_pile_up():
+    class EndlessFeed:
+        polls = 0
+        piled_up, over_polled = threading.Event(), threading.Event()
+
+        def poll(self, limit=None):
+            self.polls += 1
+            if self.polls == 3:
+                self.piled_up.set()
+            elif self.polls > 3:
+                self.over_polled.set()
+            return [f'{self.polls}-{i}' for i in range(5)], self.polls
+
+    feed, release = EndlessFeed(), threading.Event()
+
+    def validate(materials):
+        release.wait()
+        return pd.DataFrame()
+
+    watcher = Watcher(feed, validate, ListSink(), interval=0.001, max_batch=5, max_pending=1)
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+
+    # one batch validating, one queued, one full open batch
+    assert feed.piled_up.wait(10)
+    assert not feed.over_polled.wait(0.1)
+
+    watcher.stop()
+    release.set()
+    thread.join()